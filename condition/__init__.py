@@ -9,6 +9,8 @@ from .condition import (
     NewAlwaysTrue,
     NewAlwaysFalse
 )
+from .intern import InternTable, intern_condition
+from .optimize import optimize, expand_not
 from .op import Op, JoinOp
 from .context import Context
 from .selector import Selector, DefaultSelector, join_selector, not_selector
@@ -20,7 +22,8 @@ from .func import (
     contains_any_func,
     is_not_zero_func
 )
-from .values import unquote, val_to_int64_slice, val_to_string_slice
+from .period import PeriodUnit, add_period, check_period_unit
+from .values import unquote, val_to_int64_slice, val_to_string_slice, parse_int64_literal, parse_string_literal
 from .var import ValType
 
 __all__ = [
@@ -33,6 +36,10 @@ __all__ = [
     'IsAlwaysFalse',
     'NewAlwaysTrue',
     'NewAlwaysFalse',
+    'InternTable',
+    'intern_condition',
+    'optimize',
+    'expand_not',
     'Op',
     'JoinOp',
     'ValType',
@@ -50,7 +57,12 @@ __all__ = [
     'today_func',
     'contains_any_func',
     'is_not_zero_func',
+    'PeriodUnit',
+    'add_period',
+    'check_period_unit',
     'unquote',
     'val_to_int64_slice',
-    'val_to_string_slice'
+    'val_to_string_slice',
+    'parse_int64_literal',
+    'parse_string_literal'
 ]
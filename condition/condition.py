@@ -1,33 +1,142 @@
-import copy
-from typing import List, Optional, Dict
+import hashlib
+from types import MappingProxyType
+from typing import Iterable, List, Mapping, Optional, Dict
 
 from condition.op import Op, JoinOp
 from condition.var import ValType
 
+_EMPTY_HINTS: Mapping[str, str] = MappingProxyType({})
+
+
+def _adopt(conditions: Optional[Iterable['Condition']]) -> tuple:
+    """子条件转为元组并冻结，被父节点引用后不能再修改"""
+    children = tuple(conditions) if conditions else ()
+    for child in children:
+        object.__setattr__(child, '_frozen', True)
+    return children
+
+
 class Condition:
+    """
+    条件节点
+
+    节点冻结前可以像以前一样直接给属性赋值（conditions 赋列表时转为元组保存）；
+    首次计算指纹（比较、哈希、编译）或被父节点引用后冻结，之后不可变，需要修改时使用 replace 生成新节点
+    子条件以元组保存并在父节点间共享，And/Or/Not 等组合操作不再深拷贝子树
+    节点按结构计算指纹并缓存，结构相同的节点相等且哈希相同，可作为字典键
+    """
+
+    __slots__ = ('field', 'op', 'val', 'val_type', 'join_op', 'conditions', 'required',
+                 'source', '_hints', 'keyword', 'period_unit', '_fingerprint', '_frozen', '__weakref__')
+
+    # 冻结前允许赋值的属性
+    _ASSIGNABLE = frozenset(('field', 'op', 'val', 'val_type', 'join_op', 'conditions', 'required',
+                             'source', 'hints', 'keyword', 'period_unit'))
+
     def __init__(self,
                  field: str = "",
                  op: Op = None,
                  val: str = "",
                  val_type: ValType = None,
                  join_op: JoinOp = None,
-                 conditions: List['Condition'] = None,
+                 conditions: Iterable['Condition'] = None,
                  required: bool = False,
                  source: Optional['Condition'] = None,
                  hints: Dict[str, str] = None,
                  keyword: bool = False,
                  period_unit: int = 0):
-        self.field = field
-        self.op = op
-        self.val = val
-        self.val_type = val_type
-        self.join_op = join_op
-        self.conditions = conditions or []
-        self.required = required
-        self.source = source
-        self.hints = hints or {}
-        self.keyword = keyword
-        self.period_unit = period_unit
+        _set = object.__setattr__
+        _set(self, 'field', field)
+        _set(self, 'op', op)
+        _set(self, 'val', val)
+        _set(self, 'val_type', val_type)
+        _set(self, 'join_op', join_op)
+        _set(self, 'conditions', _adopt(conditions))
+        _set(self, 'required', required)
+        _set(self, 'source', source)
+        # 大部分节点没有hints，为空时不保存字典
+        _set(self, '_hints', dict(hints) if hints else None)
+        _set(self, 'keyword', keyword)
+        _set(self, 'period_unit', period_unit)
+        _set(self, '_fingerprint', None)
+        _set(self, '_frozen', False)
+
+    def __setattr__(self, name, value):
+        if name not in self._ASSIGNABLE:
+            raise AttributeError(f"Condition has no assignable attribute {name}")
+        if self._frozen:
+            raise AttributeError(f"Condition is frozen, use replace() to change {name}")
+        if name == 'conditions':
+            value = _adopt(value)
+        elif name == 'hints':
+            name, value = '_hints', dict(value) if value else None
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Condition is immutable, can not delete {name}")
+
+    def __reduce__(self):
+        return (self.__class__, (self.field, self.op, self.val, self.val_type, self.join_op,
+                                 self.conditions, self.required, self.source, self._hints,
+                                 self.keyword, self.period_unit))
+
+    def __eq__(self, other) -> bool:
+        if self is other:
+            return True
+        if not isinstance(other, Condition):
+            return NotImplemented
+        return self.fingerprint() == other.fingerprint()
+
+    def __hash__(self) -> int:
+        return hash(self.fingerprint())
+
+    def fingerprint(self) -> str:
+        """
+        结构指纹
+
+        由 field/op/val/val_type/join_op/required/keyword/period_unit 及子条件指纹计算，
+        不含 hints/source；首次计算后缓存，跨进程稳定
+        """
+        fingerprint = self._fingerprint
+        if fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(repr((
+                self.field,
+                self.op.value if self.op else None,
+                self.val,
+                int(self.val_type) if self.val_type is not None else None,
+                self.join_op.value if self.join_op else None,
+                self.required,
+                self.keyword,
+                self.period_unit,
+                len(self.conditions),
+            )).encode())
+            for child in self.conditions:
+                h.update(child.fingerprint().encode())
+            fingerprint = h.hexdigest()
+            object.__setattr__(self, '_fingerprint', fingerprint)
+            object.__setattr__(self, '_frozen', True)
+        return fingerprint
+
+    def __copy__(self) -> 'Condition':
+        return self.clone()
+
+    def __deepcopy__(self, memo) -> 'Condition':
+        return self.clone()
+
+    @property
+    def hints(self) -> Mapping[str, str]:
+        """提示信息（只读）"""
+        return MappingProxyType(self._hints) if self._hints else _EMPTY_HINTS
+
+    def replace(self, **changes) -> 'Condition':
+        """基于当前节点生成修改了部分属性的新节点，未修改的子条件共享"""
+        attrs = dict(field=self.field, op=self.op, val=self.val, val_type=self.val_type,
+                     join_op=self.join_op, conditions=self.conditions, required=self.required,
+                     source=self.source, hints=self._hints, keyword=self.keyword,
+                     period_unit=self.period_unit)
+        attrs.update(changes)
+        return self.__class__(**attrs)
 
     def is_empty(self) -> bool:
         """判断条件是否为空"""
@@ -35,23 +144,14 @@ class Condition:
                 not self.join_op and not self.conditions)
 
     def clone(self) -> 'Condition':
-        """克隆条件"""
-        return copy.deepcopy(self)
+        """克隆条件，已冻结的节点直接共享，未冻结的节点生成新节点（子条件已冻结，共享）"""
+        return self if self._frozen else self.replace()
 
     def equals(self, other: 'Condition') -> bool:
-        """判断两个条件是否相等"""
+        """判断两个条件是否相等，比较缓存的结构指纹"""
         if not other:
             return False
-        return (self.field == other.field and
-                self.op == other.op and
-                self.val == other.val and
-                self.val_type == other.val_type and
-                self.join_op == other.join_op and
-                self.required == other.required and
-                self.keyword == other.keyword and
-                self.period_unit == other.period_unit and
-                len(self.conditions) == len(other.conditions) and
-                all(c1.equals(c2) for c1, c2 in zip(self.conditions, other.conditions)))
+        return self.fingerprint() == other.fingerprint()
 
     def is_join(self) -> bool:
         """判断是否为连接条件"""
@@ -71,25 +171,18 @@ class Condition:
         """取反条件"""
         if self.is_join() and self.join_op == JoinOp.NOT:
             if len(self.conditions) == 1:
-                return self.conditions[0].clone()
+                return self.conditions[0]
 
-        not_cond = Condition()
-        not_cond.join_op = JoinOp.NOT
-        not_cond.conditions = [self.clone()]
-        return not_cond
+        return Condition(join_op=JoinOp.NOT, conditions=(self,))
 
     def simplify(self) -> 'Condition':
         """
         简化条件
 
-        not(not(A)) -> A
+        展平、去重、常量折叠、吸收律及同字段范围合并，见 optimize.optimize
         """
-        if self.is_join() and self.join_op == JoinOp.NOT:
-            if len(self.conditions) == 1:
-                child = self.conditions[0]
-                if child.is_join() and child.join_op == JoinOp.NOT:
-                    return child.conditions[0].simplify()
-        return self
+        from .optimize import optimize
+        return optimize(self)
 
     def transform_forward(self) -> 'Condition':
         """
@@ -99,11 +192,8 @@ class Condition:
             不包含 -》 not 包含
         """
         if self.op and self.op.forward_op():
-            not_cond = Condition()
-            not_cond.join_op = JoinOp.NOT
             new_cond = Condition(self.field, self.op.forward_op(), self.val, self.val_type)
-            not_cond.conditions = [new_cond]
-            return not_cond
+            return Condition(join_op=JoinOp.NOT, conditions=(new_cond,))
         return self
 
     def all_fields(self) -> List[str]:
@@ -121,32 +211,29 @@ class Condition:
         return field in self.all_fields()
 
     def expend_not(self) -> ('Condition', bool):
-        """展开NOT操作"""
-        # 简化实现
-        return self.clone(), False
+        """展开NOT操作，见 optimize.expand_not"""
+        from .optimize import expand_not
+        return expand_not(self)
 
 
 # 预定义的恒真和恒假条件
+# 共享的恒真/恒假节点，创建时即冻结
 _always_true = Condition("1", Op.EQ, "1", ValType.INT)
 _always_false = Condition("1", Op.EQ, "2", ValType.INT)
+_always_true.fingerprint()
+_always_false.fingerprint()
 
 
 def And(*conditions: Condition) -> Condition:
-    """创建AND条件"""
-    copied_conditions = [cond.clone() for cond in conditions if cond and not cond.is_empty()]
-    result = Condition()
-    result.join_op = JoinOp.AND
-    result.conditions = copied_conditions
-    return result
+    """创建AND条件，子条件共享不拷贝"""
+    return Condition(join_op=JoinOp.AND,
+                     conditions=[cond for cond in conditions if cond and not cond.is_empty()])
 
 
 def Or(*conditions: Condition) -> Condition:
-    """创建OR条件"""
-    copied_conditions = [cond.clone() for cond in conditions if cond and not cond.is_empty()]
-    result = Condition()
-    result.join_op = JoinOp.OR
-    result.conditions = copied_conditions
-    return result
+    """创建OR条件，子条件共享不拷贝"""
+    return Condition(join_op=JoinOp.OR,
+                     conditions=[cond for cond in conditions if cond and not cond.is_empty()])
 
 
 def Not(cond: Condition) -> Condition:
@@ -172,10 +259,10 @@ def IsAlwaysFalse(c: Condition) -> bool:
 
 
 def NewAlwaysTrue() -> Condition:
-    """创建新的恒真条件"""
-    return _always_true.clone()
+    """创建新的恒真条件，节点不可变，返回共享实例"""
+    return _always_true
 
 
 def NewAlwaysFalse() -> Condition:
-    """创建新的恒假条件"""
-    return _always_false.clone()
+    """创建新的恒假条件，节点不可变，返回共享实例"""
+    return _always_false
@@ -60,32 +60,30 @@ def convert_condition(c: Condition, opt: ConvertOption) -> Tuple[Condition, Exce
     if not c.is_join():
         return _convert_for_single(c, opt)
 
-    dst = c.clone()
-    dst.conditions = []
-
+    conditions = []
     for child in c.conditions:
         child_dst, inner_err = convert_condition(child, opt)
         if inner_err:
             return None, inner_err
-        dst.conditions.append(child_dst)
+        conditions.append(child_dst)
 
-    return dst, None
+    return c.replace(conditions=conditions), None
 
 
 def _convert_for_single(c: Condition, opt: ConvertOption) -> Tuple[Condition, Exception]:
     """转换单个条件"""
-    dst = c.clone()
+    dst = c
 
     # 应用字段映射
     for mapping in opt.mappings:
         if mapping.source_field == c.field:
-            dst.field = mapping.target_field
+            dst = dst.replace(field=mapping.target_field)
             # 应用值映射
             if mapping.val_mappings:
                 source_val_type = ValAndType(c.val, c.val_type.value if c.val_type else "")
                 if source_val_type in mapping.val_mappings:
                     target_val_type = mapping.val_mappings[source_val_type]
-                    dst.val = target_val_type.val
+                    dst = dst.replace(val=target_val_type.val)
                     # 这里应该设置正确的ValType，简化处理
             break
 
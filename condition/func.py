@@ -5,6 +5,7 @@ import redis
 import group
 from . import InGrouper
 from .context import Context
+from .period import Today, add_period
 import threading
 from concurrent.futures import ThreadPoolExecutor
 import logging
@@ -32,20 +33,7 @@ def add_period_func() -> Tuple[str, Callable]:
         except (ValueError, TypeError):
             raise ValueError("AddPeriod param[2] must be int")
 
-        # 简化实现，实际应该根据unit_int进行不同的时间计算
-        # 这里只做一个示例实现
-        if isinstance(now, datetime):
-            # 根据unit_int进行不同的时间操作
-            if unit_int == 2:  # 秒
-                return now.replace(second=now.second + duration)
-            elif unit_int == 3:  # 分
-                return now.replace(minute=now.minute + duration)
-            elif unit_int == 4:  # 小时
-                return now.replace(hour=now.hour + duration)
-            elif unit_int == 5:  # 天
-                return now.replace(day=now.day + duration)
-
-        return now
+        return add_period(now, duration, unit_int)
 
     return "AddPeriod", fn
 
@@ -53,11 +41,8 @@ def add_period_func() -> Tuple[str, Callable]:
 def today_func() -> Tuple[str, Callable]:
     """用于给expr.Function添加Today()方法"""
 
-    def fn(*params) -> Any:
-        now = datetime.now()
-        return datetime(now.year, now.month, now.day)
-
-    return "Today", fn
+    # 今天零点缓存到下一个零点
+    return "Today", Today()
 
 
 def contains_any_func() -> Tuple[str, Callable]:
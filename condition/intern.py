@@ -0,0 +1,41 @@
+import weakref
+from typing import MutableMapping
+from .condition import Condition
+
+
+class InternTable:
+    """
+    条件驻留表
+
+    结构相同的条件（含子条件）只保留一个节点，跨规则共享；
+    默认弱引用保存，规则释放后节点可被回收
+    """
+
+    def __init__(self, weak: bool = True):
+        self._nodes: MutableMapping[str, Condition] = weakref.WeakValueDictionary() if weak else {}
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def intern(self, c: Condition) -> Condition:
+        """返回与c结构相同的驻留节点，子条件同样驻留"""
+        fingerprint = c.fingerprint()
+        node = self._nodes.get(fingerprint)
+        if node is not None:
+            return node
+
+        if c.conditions:
+            children = tuple(self.intern(child) for child in c.conditions)
+            if any(new is not old for new, old in zip(children, c.conditions)):
+                c = c.replace(conditions=children)
+        self._nodes[fingerprint] = c
+        return c
+
+
+# 全局驻留表
+_default_table = InternTable()
+
+
+def intern_condition(c: Condition) -> Condition:
+    """使用全局驻留表驻留条件"""
+    return _default_table.intern(c)
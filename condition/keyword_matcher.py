@@ -0,0 +1,103 @@
+from collections import deque
+from typing import Dict, Iterable, List
+
+try:
+    import ahocorasick  # pyahocorasick，可选的C扩展实现
+except ImportError:
+    ahocorasick = None
+
+# 关键词较少时逐个子串查找（C实现的 str.__contains__）更快，
+# 超过阈值后使用自动机；纯python自动机的逐字符开销较大，阈值更高
+EXTENSION_MIN_KEYWORDS = 16
+AUTOMATON_MIN_KEYWORDS = 160
+
+
+class KeywordMatcher:
+    """
+    多关键词匹配器（Aho-Corasick 自动机）
+
+    规则编译时构建一次，匹配时单次扫描文本即可判断是否包含任一关键词，
+    语义与 ContainsAny 关键词模式一致：str(text) 中包含任一 str(keyword)
+    安装了 pyahocorasick 时使用其C扩展，否则使用纯python实现；关键词数量低于阈值时
+    直接逐个查找
+    """
+
+    def __init__(self, keywords: Iterable, use_extension: bool = True):
+        self.keywords: List[str] = list(dict.fromkeys(str(k) for k in keywords))
+        # 空关键词是任何文本的子串
+        self._match_all = "" in self.keywords
+        self._automaton = None
+        self._goto: List[Dict[str, int]] = []
+        self._fail: List[int] = []
+        self._output: List[bool] = []
+
+        if self._match_all or not self.keywords:
+            return
+        if use_extension and ahocorasick is not None:
+            if len(self.keywords) >= EXTENSION_MIN_KEYWORDS:
+                self._automaton = ahocorasick.Automaton()
+                for keyword in self.keywords:
+                    self._automaton.add_word(keyword, keyword)
+                self._automaton.make_automaton()
+        elif len(self.keywords) >= AUTOMATON_MIN_KEYWORDS:
+            self._build()
+
+    def _build(self) -> None:
+        """构建 goto/fail 表"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[bool] = [False]
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    output.append(False)
+                state = next_state
+            output[state] = True
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[next_state] = goto[f].get(ch, 0)
+                # 后缀为关键词时该状态同样命中
+                output[next_state] = output[next_state] or output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def search(self, text: str) -> bool:
+        """文本中是否包含任一关键词"""
+        if self._match_all:
+            return True
+        if self._automaton is not None:
+            for _ in self._automaton.iter(text):
+                return True
+            return False
+        if not self._goto:
+            for keyword in self.keywords:
+                if keyword in text:
+                    return True
+            return False
+
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                return True
+        return False
+
+    def __call__(self, value) -> bool:
+        return self.search(str(value))
@@ -0,0 +1,278 @@
+from typing import Any, Dict, List, Optional, Tuple
+from .condition import Condition, NewAlwaysTrue, NewAlwaysFalse
+from .op import Op, JoinOp
+from .values import unquote, val_to_time
+from .var import ValType
+
+# 取反后的操作符
+_NEGATED_OPS = {
+    Op.EQ: Op.NE,
+    Op.NE: Op.EQ,
+    Op.IN: Op.NOT_IN,
+    Op.NOT_IN: Op.IN,
+    Op.CONTAINS_ANY: Op.NOT_CONTAINS_ANY,
+    Op.NOT_CONTAINS_ANY: Op.CONTAINS_ANY,
+    Op.LT: Op.GTE,
+    Op.GTE: Op.LT,
+    Op.LTE: Op.GT,
+    Op.GT: Op.LTE,
+}
+
+# 可合并为区间的值类型
+_RANGE_VAL_TYPES = [ValType.INT, ValType.FLOAT, ValType.TIME]
+_RANGE_OPS = [Op.EQ, Op.GT, Op.GTE, Op.LT, Op.LTE]
+
+# 优化迭代上限，每轮都会使树变小或不变，通常一到两轮即收敛
+_MAX_PASSES = 8
+
+
+def optimize(c: Condition) -> Condition:
+    """
+    条件优化
+
+    自底向上反复应用以下规则直至不再变化：
+    - not(not(A)) -> A，not(恒真) -> 恒假，not(恒假) -> 恒真
+    - 展平嵌套的 AND/OR，去除空条件与重复子条件
+    - 常量折叠：AND 中恒假 -> 恒假、去掉恒真；OR 中恒真 -> 恒真、去掉恒假
+    - 吸收律：A and (A or B) -> A，A or (A and B) -> A
+    - AND 中同字段的范围条件合并为一个区间，区间为空时整体为恒假
+    """
+    for _ in range(_MAX_PASSES):
+        optimized = _optimize(c)
+        if optimized is c or optimized == c:
+            return optimized
+        c = optimized
+    return c
+
+
+def _optimize(c: Condition) -> Condition:
+    if not c.is_join():
+        return c
+    if c.join_op == JoinOp.NOT:
+        return _optimize_not(c)
+    return _optimize_junction(c)
+
+
+def _optimize_not(c: Condition) -> Condition:
+    if len(c.conditions) != 1:
+        return c
+
+    child = _optimize(c.conditions[0])
+    if not c.required:
+        if child.is_always_true():
+            return NewAlwaysFalse()
+        if child.is_always_false():
+            return NewAlwaysTrue()
+        if child.is_join() and child.join_op == JoinOp.NOT and len(child.conditions) == 1 and not child.required:
+            return child.conditions[0]
+    if child is c.conditions[0]:
+        return c
+    return c.replace(conditions=(child,))
+
+
+def _optimize_junction(c: Condition) -> Condition:
+    is_and = c.join_op == JoinOp.AND
+    # AND 中的吸收元为恒假，单位元为恒真；OR 相反
+    absorbing, identity = (Condition.is_always_false, Condition.is_always_true) if is_and \
+        else (Condition.is_always_true, Condition.is_always_false)
+
+    children: List[Condition] = []
+    seen = set()
+    for child in _flatten(c):
+        child = _optimize(child)
+        # 子条件优化后可能变为同类连接条件
+        for grandchild in _flatten_one(child, c.join_op):
+            if grandchild.is_empty() or identity(grandchild):
+                continue
+            if absorbing(grandchild):
+                return grandchild
+            if grandchild in seen:
+                continue
+            seen.add(grandchild)
+            children.append(grandchild)
+
+    children = _absorb(children, seen, c.join_op)
+    if is_and:
+        merged = _merge_ranges(children)
+        if merged is None:
+            return NewAlwaysFalse()
+        children = merged
+
+    if not children:
+        return NewAlwaysTrue() if is_and else NewAlwaysFalse()
+    if len(children) == 1 and not c.required:
+        return children[0]
+    if len(children) == len(c.conditions) and all(a is b for a, b in zip(children, c.conditions)):
+        return c
+    return c.replace(conditions=children)
+
+
+def _flatten(c: Condition) -> List[Condition]:
+    """展平与 c 相同连接符的嵌套子条件"""
+    result = []
+    for child in c.conditions:
+        result.extend(_flatten_one(child, c.join_op))
+    return result
+
+
+def _flatten_one(child: Condition, join_op: JoinOp) -> List[Condition]:
+    if child.is_join() and child.join_op == join_op and not child.required:
+        result = []
+        for grandchild in child.conditions:
+            result.extend(_flatten_one(grandchild, join_op))
+        return result
+    return [child]
+
+
+def _absorb(children: List[Condition], siblings: set, join_op: JoinOp) -> List[Condition]:
+    """吸收律：A and (A or B) -> A，A or (A and B) -> A"""
+    dual = JoinOp.OR if join_op == JoinOp.AND else JoinOp.AND
+    result = []
+    for child in children:
+        if child.is_join() and child.join_op == dual and not child.required:
+            if any(grandchild in siblings for grandchild in child.conditions):
+                continue
+        result.append(child)
+    return result
+
+
+class _Range:
+    """同一字段的区间"""
+
+    def __init__(self):
+        self.lower: Optional[Tuple[Any, bool, Condition]] = None  # (值, 是否包含, 条件)
+        self.upper: Optional[Tuple[Any, bool, Condition]] = None
+        self.eq: Optional[Tuple[Any, Condition]] = None
+
+    def add(self, op: Op, value: Any, c: Condition) -> bool:
+        """加入一个边界，出现矛盾时返回False"""
+        if op == Op.EQ:
+            if self.eq is not None and self.eq[0] != value:
+                return False
+            if self.eq is None:
+                self.eq = (value, c)
+        elif op in [Op.GT, Op.GTE]:
+            inclusive = op == Op.GTE
+            if self.lower is None or value > self.lower[0] or (value == self.lower[0] and not inclusive):
+                self.lower = (value, inclusive, c)
+        else:
+            inclusive = op == Op.LTE
+            if self.upper is None or value < self.upper[0] or (value == self.upper[0] and not inclusive):
+                self.upper = (value, inclusive, c)
+        return self.is_satisfiable()
+
+    def is_satisfiable(self) -> bool:
+        if self.lower and self.upper:
+            low, low_inclusive, _ = self.lower
+            high, high_inclusive, _ = self.upper
+            if low > high or (low == high and not (low_inclusive and high_inclusive)):
+                return False
+        if self.eq is not None:
+            value = self.eq[0]
+            if self.lower and (value < self.lower[0] or (value == self.lower[0] and not self.lower[1])):
+                return False
+            if self.upper and (value > self.upper[0] or (value == self.upper[0] and not self.upper[1])):
+                return False
+        return True
+
+    def conditions(self) -> List[Condition]:
+        if self.eq is not None:
+            return [self.eq[1]]
+        return [bound[2] for bound in (self.lower, self.upper) if bound is not None]
+
+
+def _merge_ranges(children: List[Condition]) -> Optional[List[Condition]]:
+    """合并AND中同字段的范围条件，矛盾时返回None"""
+    ranges: Dict[Tuple[str, int], _Range] = {}
+    members: Dict[Tuple[str, int], List[Condition]] = {}
+    for child in children:
+        value = _range_value(child)
+        if value is None:
+            continue
+        key = (child.field, child.val_type)
+        interval = ranges.setdefault(key, _Range())
+        try:
+            satisfiable = interval.add(child.op, value, child)
+        except TypeError:
+            # 带时区与不带时区的时间不可比较，保留原条件
+            continue
+        members.setdefault(key, []).append(child)
+        if not satisfiable:
+            return None
+
+    if all(len(m) < 2 for m in members.values()):
+        return children
+
+    kept = set()
+    for key, interval in ranges.items():
+        kept.update(id(c) for c in interval.conditions())
+    merged = set()
+    for m in members.values():
+        merged.update(id(c) for c in m)
+    return [child for child in children if id(child) not in merged or id(child) in kept]
+
+
+def _range_value(c: Condition) -> Any:
+    """可合并范围条件的比较值，不可合并时返回None"""
+    if c.is_join() or c.val_type not in _RANGE_VAL_TYPES or c.op not in _RANGE_OPS:
+        return None
+    if c.is_always_true() or c.is_always_false():
+        return None
+    if c.val_type == ValType.FLOAT and c.op == Op.EQ:
+        return None
+    try:
+        if c.val_type == ValType.INT:
+            return int(unquote(c.val))
+        if c.val_type == ValType.FLOAT:
+            return float(unquote(c.val))
+        return val_to_time(c.val)
+    except ValueError:
+        return None
+
+
+def expand_not(c: Condition) -> Tuple[Condition, bool]:
+    """
+    展开NOT操作
+
+    按德摩根律将 NOT 下推到叶子条件，叶子条件的操作符取反（如 < 变为 >=）；
+    标记了 required 的 NOT 条件需要额外的零值判断，保持不变。返回 (新条件, 是否有展开)
+    """
+    if not c.is_join():
+        return c, False
+
+    if c.join_op == JoinOp.NOT:
+        if len(c.conditions) != 1 or c.required:
+            return c, False
+        negated = _negate(c.conditions[0])
+        if negated is None:
+            child, expanded = expand_not(c.conditions[0])
+            return (c.replace(conditions=(child,)), True) if expanded else (c, False)
+        result, _ = expand_not(negated)
+        return result, True
+
+    expanded = False
+    children = []
+    for child in c.conditions:
+        new_child, child_expanded = expand_not(child)
+        expanded = expanded or child_expanded
+        children.append(new_child)
+    return (c.replace(conditions=children), True) if expanded else (c, False)
+
+
+def _negate(c: Condition) -> Optional[Condition]:
+    """直接生成 not c 的等价条件，无法直接取反时返回None"""
+    if c.is_join():
+        if c.join_op == JoinOp.NOT:
+            return c.conditions[0] if len(c.conditions) == 1 and not c.required else None
+        if c.required:
+            return None
+        dual = JoinOp.OR if c.join_op == JoinOp.AND else JoinOp.AND
+        return c.replace(join_op=dual,
+                         conditions=[Condition(join_op=JoinOp.NOT, conditions=(child,)) for child in c.conditions])
+    if c.is_always_true():
+        return NewAlwaysFalse()
+    if c.is_always_false():
+        return NewAlwaysTrue()
+    if c.op in _NEGATED_OPS and not c.required:
+        return c.replace(op=_NEGATED_OPS[c.op])
+    return None
@@ -0,0 +1,106 @@
+import calendar
+import threading
+import time
+from datetime import date, datetime, timedelta
+from enum import IntEnum
+from typing import Callable, Dict, Optional, Union
+
+
+class PeriodUnit(IntEnum):
+    """相对时间单位枚举"""
+    MILLISECOND = 1  # 毫秒
+    SECOND = 2       # 秒
+    MINUTE = 3       # 分
+    HOUR = 4         # 小时
+    DAY = 5          # 天
+    WEEK = 6         # 周
+    MONTH = 7        # 月
+    YEAR = 8         # 年
+
+
+# 定长单位的单位偏移量，计算时乘以数量即可
+_FIXED_OFFSETS: Dict[int, timedelta] = {
+    PeriodUnit.MILLISECOND: timedelta(milliseconds=1),
+    PeriodUnit.SECOND: timedelta(seconds=1),
+    PeriodUnit.MINUTE: timedelta(minutes=1),
+    PeriodUnit.HOUR: timedelta(hours=1),
+    PeriodUnit.DAY: timedelta(days=1),
+    PeriodUnit.WEEK: timedelta(weeks=1),
+}
+
+# 按月计算的单位对应的月数
+_MONTH_OFFSETS: Dict[int, int] = {
+    PeriodUnit.MONTH: 1,
+    PeriodUnit.YEAR: 12,
+}
+
+DateLike = Union[datetime, date]
+
+
+def check_period_unit(unit: int) -> PeriodUnit:
+    """检查相对时间单位，不支持时抛出ValueError"""
+    try:
+        return PeriodUnit(unit)
+    except ValueError:
+        raise ValueError(f"unsupported period unit {unit}") from None
+
+
+def add_period(t: DateLike, duration: int, unit: int) -> DateLike:
+    """
+    时间加上 duration 个 unit，duration 为负数时向前
+
+    定长单位使用 timedelta 计算，跨分钟/小时/天/月自动进位；月、年按日历月计算，
+    目标月份没有该日时取月末（1月31日加一个月为2月28/29日）。date 只保留日期部分。
+    不支持的单位抛出ValueError
+    """
+    offset = _FIXED_OFFSETS.get(unit)
+    if offset is not None:
+        return t + offset * duration
+
+    months = _MONTH_OFFSETS.get(unit)
+    if months is not None:
+        return add_months(t, months * duration)
+
+    raise ValueError(f"unsupported period unit {unit}")
+
+
+def add_months(t: DateLike, months: int) -> DateLike:
+    """按日历月加减，日超出目标月份天数时取月末"""
+    month_index = t.year * 12 + t.month - 1 + months
+    year, month = divmod(month_index, 12)
+    month += 1
+    if not 1 <= year <= 9999:
+        raise OverflowError("date value out of range")
+    day = min(t.day, calendar.monthrange(year, month)[1])
+    return t.replace(year=year, month=month, day=day)
+
+
+class Today:
+    """
+    今天零点
+
+    结果缓存到下一个零点，缓存期间每次调用只比较一次时间戳
+    """
+
+    def __init__(self, now_func: Optional[Callable[[], datetime]] = None):
+        # 注入的 now_func 可能与系统时间不一致，此时不使用时间戳缓存
+        self._now_func = now_func
+        self._lock = threading.Lock()
+        self._today: Optional[datetime] = None
+        self._expires = 0.0
+
+    def __call__(self, *params) -> datetime:
+        if self._now_func is not None:
+            return _midnight(self._now_func())
+        if time.time() < self._expires:
+            return self._today
+        with self._lock:
+            now = datetime.now()
+            today = _midnight(now)
+            self._today = today
+            self._expires = (today + timedelta(days=1)).timestamp()
+        return today
+
+
+def _midnight(t: datetime) -> datetime:
+    return datetime(t.year, t.month, t.day)
@@ -1,5 +1,19 @@
 import json
-from typing import List, Union
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Tuple, Union
+
+# 列表字面量解析缓存容量，规则集中的常量列表通常有限且反复出现
+LITERAL_CACHE_SIZE = 4096
+
+# date(...) 支持的时间格式，按顺序尝试
+_TIME_LAYOUTS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%Y/%m/%d",
+]
 
 
 def unquote(val: str) -> str:
@@ -15,48 +29,87 @@ def unquote(val: str) -> str:
 
 def val_to_int64_slice(val: str) -> List[int]:
     """将值转换为int64切片"""
+    return list(parse_int64_literal(val))
+
+
+def val_to_string_slice(val: str) -> List[str]:
+    """将值转换为字符串切片"""
+    return list(parse_string_literal(val))
+
+
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def parse_int64_literal(val: str) -> Tuple[int, ...]:
+    """
+    解析整数列表字面量，结果按原始值缓存
+
+    纯整数数组直接按逗号切分转换，不经过 json；返回不可变元组，供编译期共享
+    """
     val = unquote(val)
     if not val:
-        return []
+        return ()
 
     try:
-        # 尝试解析为JSON数组
         if val.startswith('[') and val.endswith(']'):
+            body = val[1:-1]
+            if not body.strip():
+                return ()
+            # 快速路径：纯整数数组，int() 本身会忽略两侧空白
+            try:
+                return tuple(map(int, body.split(',')))
+            except ValueError:
+                pass
+            # 尝试解析为JSON数组
             data = json.loads(val)
             if isinstance(data, list):
-                return [int(item) for item in data]
+                return tuple(int(item) for item in data)
         else:
             # 单个值
-            return [int(val)]
+            return (int(val),)
     except (json.JSONDecodeError, ValueError):
         # 尝试逗号分隔
         try:
             items = val.split(',')
-            return [int(item.strip()) for item in items if item.strip()]
+            return tuple(int(item.strip()) for item in items if item.strip())
         except ValueError:
             pass
 
-    return []
+    return ()
 
 
-def val_to_string_slice(val: str) -> List[str]:
-    """将值转换为字符串切片"""
+@lru_cache(maxsize=LITERAL_CACHE_SIZE)
+def parse_string_literal(val: str) -> Tuple[str, ...]:
+    """解析字符串列表字面量，结果按原始值缓存，返回不可变元组"""
     val = unquote(val)
     if not val:
-        return []
+        return ()
 
     try:
         # 尝试解析为JSON数组
         if val.startswith('[') and val.endswith(']'):
             data = json.loads(val)
             if isinstance(data, list):
-                return [str(item) for item in data]
+                return tuple(str(item) for item in data)
         else:
             # 单个值
-            return [val]
+            return (val,)
     except json.JSONDecodeError:
         # 尝试逗号分隔
         items = val.split(',')
-        return [item.strip() for item in items if item.strip()]
+        return tuple(item.strip() for item in items if item.strip())
+
+    return ()
+
 
-    return []
+def val_to_time(val: str) -> datetime:
+    """将值转换为时间"""
+    val = unquote(val)
+    try:
+        return datetime.fromisoformat(val)
+    except ValueError:
+        pass
+    for layout in _TIME_LAYOUTS:
+        try:
+            return datetime.strptime(val, layout)
+        except ValueError:
+            continue
+    raise ValueError(f"invalid time value: {val}")
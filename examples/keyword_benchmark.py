@@ -0,0 +1,41 @@
+import random
+import string
+import timeit
+
+from condition.condition import Condition, Op, ValType
+from condition.func import contains_any_func
+from condition.keyword_matcher import KeywordMatcher, ahocorasick
+from expr.compiler import compile_condition
+
+
+def random_word(rnd: random.Random, length: int) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def main():
+    rnd = random.Random(0)
+    # 模拟标题/描述文本，均不命中关键词，测量最坏情况的完整扫描
+    texts = [" ".join(random_word(rnd, rnd.randint(3, 9)) for _ in range(30)) for _ in range(50)]
+    _, contains_any_fn = contains_any_func()
+    number = 20
+
+    print(f"pyahocorasick: {'已安装' if ahocorasick else '未安装'}")
+    print(f"{'关键词数':<10}{'逐个查找(ms)':<16}{'纯python(ms)':<16}{'编译后叶子(ms)':<16}{'加速比':<8}")
+    for size in [10, 50, 100, 200, 500, 1000, 2000]:
+        keywords = [random_word(rnd, 10) for _ in range(size)]
+        cond = Condition("Title", Op.CONTAINS_ANY, str(keywords).replace("'", '"'), ValType.STRING, keyword=True)
+        evaluate = compile_condition(cond)
+        pure_python = KeywordMatcher(keywords, use_extension=False)
+        envs = [{"Title": text} for text in texts]
+
+        scan = timeit.timeit(lambda: [contains_any_fn(text, keywords, True) for text in texts], number=number)
+        pure = timeit.timeit(lambda: [pure_python(text) for text in texts], number=number)
+        compiled = timeit.timeit(lambda: [evaluate(env) for env in envs], number=number)
+
+        per_call = 1000 / number
+        print(f"{size:<10}{scan * per_call:<16.3f}{pure * per_call:<16.3f}{compiled * per_call:<16.3f}"
+              f"{scan / compiled:<8.1f}")
+
+
+if __name__ == "__main__":
+    main()
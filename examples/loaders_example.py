@@ -25,7 +25,7 @@ class Actor:
 
 class BaseLoader(Loader):
     def __init__(self):
-        super().__init__("BaseLoader", 5)
+        super().__init__("BaseLoader", 5, provides=["Age()"])
 
     async def load(self, condition: Condition, items: list) -> list:
         name_to_age = {
@@ -50,7 +50,7 @@ class BaseLoader(Loader):
 
 class TagsLoader(Loader):
     def __init__(self):
-        super().__init__("TagsLoader", 10)
+        super().__init__("TagsLoader", 10, provides=["Tags()"])
 
     async def load(self, condition: Condition, items: list) -> list:
         name_to_tags = {
@@ -82,11 +82,11 @@ async def main():
         Condition("Tags()", Op.CONTAINS_ANY, '["Pig"]', ValType.STRING)
     ]
 
-    # 创建加载器
+    # 创建加载器，两者填充的字段互不依赖
     loaders = [BaseLoader(), TagsLoader()]
 
-    # 创建执行器
-    executor = Executor(cond, loaders, Actor)
+    # 创建执行器；prune=True 时按成本依次加载，年龄不满足的条目不再加载标签
+    executor = Executor(cond, loaders, Actor, prune=True)
 
     # 创建测试数据
     items = [
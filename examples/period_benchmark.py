@@ -0,0 +1,65 @@
+import timeit
+from datetime import datetime
+
+from condition.condition import Condition, Op, ValType
+from condition.func import add_period_func, today_func
+from condition.period import PeriodUnit
+from expr.compiler import compile_condition, default_functions
+
+
+def legacy_add_period(now: datetime, duration: int, unit: int) -> datetime:
+    """改写前的实现（仅秒/分/时/天，跨进位时抛出异常）"""
+    if unit == 2:
+        return now.replace(second=now.second + duration)
+    elif unit == 3:
+        return now.replace(minute=now.minute + duration)
+    elif unit == 4:
+        return now.replace(hour=now.hour + duration)
+    elif unit == 5:
+        return now.replace(day=now.day + duration)
+    return now
+
+
+def legacy_today() -> datetime:
+    now = datetime.now()
+    return datetime(now.year, now.month, now.day)
+
+
+def main():
+    _, add_period = add_period_func()
+    _, today = today_func()
+    # 取月中时间，使改写前的实现不因进位抛出异常
+    now = datetime(2024, 5, 15, 12, 30, 30)
+    number = 200000
+
+    print(f"{'函数':<24}{'改写前(ns)':<14}{'改写后(ns)':<14}")
+    for unit in [PeriodUnit.SECOND, PeriodUnit.MINUTE, PeriodUnit.HOUR, PeriodUnit.DAY]:
+        before = timeit.timeit(lambda: legacy_add_period(now, -3, unit), number=number)
+        after = timeit.timeit(lambda: add_period(now, -3, unit), number=number)
+        print(f"{'AddPeriod ' + unit.name:<24}{before / number * 1e9:<14.0f}{after / number * 1e9:<14.0f}")
+    for unit in [PeriodUnit.WEEK, PeriodUnit.MONTH, PeriodUnit.YEAR]:
+        after = timeit.timeit(lambda: add_period(now, -3, unit), number=number)
+        print(f"{'AddPeriod ' + unit.name:<24}{'不支持':<14}{after / number * 1e9:<14.0f}")
+    before = timeit.timeit(legacy_today, number=number)
+    after = timeit.timeit(today, number=number)
+    print(f"{'Today':<24}{before / number * 1e9:<14.0f}{after / number * 1e9:<14.0f}")
+
+    # 相对时间叶子：逐条求值与时钟快照内求值
+    functions = default_functions()
+    clock = functions["Clock"]
+    evaluate = compile_condition(Condition("Created", Op.GT, "7", ValType.TIME_BEFORE,
+                                           period_unit=PeriodUnit.DAY), functions)
+    envs = [{"Created": now} for _ in range(1000)]
+    per_item = timeit.timeit(lambda: [evaluate(env) for env in envs], number=100)
+
+    def batch():
+        with clock.snapshot():
+            return [evaluate(env) for env in envs]
+
+    snapshot = timeit.timeit(batch, number=100)
+    print(f"{'TIME_BEFORE 叶子':<24}{per_item / 100 / 1000 * 1e9:<14.0f}{snapshot / 100 / 1000 * 1e9:<14.0f}"
+          f"（逐条 / 时钟快照）")
+
+
+if __name__ == "__main__":
+    main()
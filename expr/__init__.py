@@ -1,3 +1,7 @@
-from .expr import expr,expr_with_or_split
+from .expr import (expr,expr_with_or_split,iter_expr_with_or_split,conditions_with_or_split,OrSplitLimitError,
+                   expr_cache_info)
+from .compiler import compile_condition
+from .clock import Clock
 
-__all__ = ['expr','expr_with_or_split']
+__all__ = ['expr','expr_with_or_split','iter_expr_with_or_split','conditions_with_or_split','OrSplitLimitError',
+           'expr_cache_info','compile_condition','Clock']
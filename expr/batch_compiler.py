@@ -0,0 +1,115 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional
+from condition.condition import Condition, JoinOp
+from .compiler import ConditionCompiler
+from .value_handle.base_handler import field_accessor
+from .value_handle.factory import HandlerFactory
+from .value_handle.vector import np, require_numpy, to_pylist
+
+# 批量求值函数：入参为 (字段名 -> numpy列, 行数)，返回布尔掩码
+BatchEvaluateFunc = Callable[[Mapping[str, Any], int], Any]
+
+
+class BatchConditionCompiler:
+    """
+    批量条件编译器
+
+    叶子条件优先使用值类型处理器提供的向量化闭包，AND/OR/NOT 组合布尔掩码；
+    不支持向量化的叶子条件回退为基于标量闭包的逐行求值
+    """
+
+    def __init__(self, functions: Optional[Dict[str, Callable]] = None):
+        require_numpy()
+        self._handler_factory = HandlerFactory()
+        self._scalar_compiler = ConditionCompiler(functions)
+        self._functions = self._scalar_compiler.functions
+
+    def compile(self, c: Condition) -> BatchEvaluateFunc:
+        """编译条件为批量求值函数"""
+        target = c.transform_forward()
+        target = target.simplify()
+
+        evaluate = self._compile(target)
+        if evaluate is None:
+            return lambda columns, size: np.ones(size, dtype=bool)
+        return evaluate
+
+    def _compile(self, c: Condition) -> Optional[BatchEvaluateFunc]:
+        if c.is_join():
+            return self._compile_join(c)
+
+        if c.is_always_true():
+            return lambda columns, size: np.ones(size, dtype=bool)
+        if c.is_always_false():
+            return lambda columns, size: np.zeros(size, dtype=bool)
+
+        if not c.field or not c.op or not c.val:
+            return None
+
+        if c.op.forward_op():
+            return self._compile(c.transform_forward())
+
+        return self._compile_single(c)
+
+    def _compile_join(self, c: Condition) -> Optional[BatchEvaluateFunc]:
+        if c.join_op == JoinOp.NOT:
+            if len(c.conditions) != 1:
+                raise ValueError("invalid condition:not join condition should have only one child")
+
+            child = self._compile(c.conditions[0])
+            if child is None:
+                return None
+
+            if c.required:
+                is_not_zero = self._row_wise(self._is_not_zero_evaluator(c.conditions[0].field))
+                return lambda columns, size: is_not_zero(columns, size) & ~child(columns, size)
+
+            return lambda columns, size: ~child(columns, size)
+
+        children = [f for f in (self._compile(child) for child in c.conditions) if f is not None]
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+
+        reduce = np.logical_and.reduce if c.join_op == JoinOp.AND else np.logical_or.reduce
+        return lambda columns, size: reduce([child(columns, size) for child in children])
+
+    def _compile_single(self, c: Condition) -> BatchEvaluateFunc:
+        row_wise = self._row_wise(self._handler_factory.build_evaluator(c, self._functions))
+        vector = self._handler_factory.build_batch_evaluator(c, self._functions)
+        if vector is None:
+            return row_wise
+
+        def evaluate(columns: Mapping[str, Any], size: int) -> Any:
+            try:
+                return np.asarray(vector(columns), dtype=bool)
+            except (TypeError, ValueError):
+                # 列类型不满足向量化要求（如多值列表、空值），回退逐行求值
+                return row_wise(columns, size)
+
+        return evaluate
+
+    def _is_not_zero_evaluator(self, field: str) -> Callable[[Mapping[str, Any]], bool]:
+        is_not_zero = self._functions["IsNotZero"]
+        get = field_accessor(field)
+        return lambda env: is_not_zero(get(env))
+
+    @staticmethod
+    def _row_wise(evaluate: Callable[[Mapping[str, Any]], bool]) -> BatchEvaluateFunc:
+        """将标量闭包包装为逐行求值的批量函数，列先转为python值，逐行求值异常直接抛出"""
+
+        def row_wise(columns: Mapping[str, Any], size: int) -> Any:
+            values = {name: to_pylist(column) for name, column in columns.items()}
+            names: List[str] = list(values)
+            return np.fromiter(
+                (evaluate({name: values[name][i] for name in names}) for i in range(size)),
+                dtype=bool,
+                count=size,
+            )
+
+        return row_wise
+
+
+def compile_condition_batch(c: Condition, functions: Optional[Dict[str, Callable]] = None) -> BatchEvaluateFunc:
+    """编译条件为批量向量化求值函数，需要安装numpy"""
+    return BatchConditionCompiler(functions).compile(c)
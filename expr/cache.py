@@ -0,0 +1,56 @@
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Callable, Hashable
+
+# 缓存命中统计
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache:
+    """
+    线程安全的LRU缓存
+
+    未命中时在锁外构建，并发未命中时可能重复构建，结果相同；maxsize 为 0 时不缓存
+    """
+
+    def __init__(self, maxsize: int):
+        self._maxsize = maxsize
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """按键查找缓存，未命中时构建并写入，超出容量时淘汰最久未使用的"""
+        if self._maxsize <= 0:
+            return build()
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return value
+            self._misses += 1
+
+        value = build()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+        return value
+
+    def info(self) -> CacheInfo:
+        """命中统计"""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._data))
+
+    def clear(self) -> None:
+        """清空缓存及统计"""
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
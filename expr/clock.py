@@ -0,0 +1,70 @@
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Iterator, Optional
+
+
+class ClockSnapshot:
+    """时钟快照，批次内所有条目看到相同的 now"""
+
+    __slots__ = ('now',)
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+
+class Clock:
+    """
+    求值时钟
+
+    相对时间条件（TIME_BEFORE/TIME_AFTER）通过时钟获取当前时间。默认每次读取 now_func()；
+    snapshot() 期间固定为快照时间，相对时间边界在同一快照内只计算一次。
+    快照按线程保存，只应包裹同步的求值过程，不要跨 await
+    """
+
+    def __init__(self, now_func: Optional[Callable[[], datetime]] = None):
+        self._now_func = now_func or datetime.now
+        self._local = threading.local()
+
+    def current(self) -> Optional[ClockSnapshot]:
+        """当前线程生效的快照，未处于快照中时返回None"""
+        return getattr(self._local, 'snapshot', None)
+
+    def now(self) -> datetime:
+        """当前时间，处于快照中时返回快照时间"""
+        snapshot = self.current()
+        return snapshot.now if snapshot is not None else self._now_func()
+
+    @contextmanager
+    def snapshot(self, now: Optional[datetime] = None) -> Iterator[ClockSnapshot]:
+        """固定当前时间，可嵌套，退出后恢复外层快照"""
+        previous = self.current()
+        snapshot = ClockSnapshot(now or self._now_func())
+        self._local.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._local.snapshot = previous
+
+
+def relative_bound(clock: Clock, add_period: Callable, duration: int,
+                   period_unit: int) -> Callable[[], datetime]:
+    """
+    生成相对时间边界 AddPeriod(now, duration, period_unit) 的取值函数
+
+    处于快照中时每个快照只计算一次，之后直接返回缓存值；否则每次按当前时间计算
+    """
+    # (快照, 边界)，整体替换保证并发读取时二者一致
+    memo = [(None, None)]
+
+    def bound() -> datetime:
+        snapshot = clock.current()
+        if snapshot is None:
+            return add_period(clock.now(), duration, period_unit)
+        cached_snapshot, value = memo[0]
+        if cached_snapshot is not snapshot:
+            value = add_period(snapshot.now, duration, period_unit)
+            memo[0] = (snapshot, value)
+        return value
+
+    return bound
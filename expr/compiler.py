@@ -0,0 +1,144 @@
+from typing import Any, Callable, Dict, List, Mapping, Optional
+from condition.condition import Condition, JoinOp
+from condition.func import add_period_func, today_func, contains_any_func, is_not_zero_func
+from .clock import Clock
+from .value_handle.base_handler import field_accessor
+from .value_handle.factory import HandlerFactory
+
+# 编译后的求值函数，入参为字段环境（字段名 -> 值或无参方法）
+EvaluateFunc = Callable[[Mapping[str, Any]], bool]
+
+
+def default_functions() -> Dict[str, Callable]:
+    """编译求值闭包默认可用的内置函数，Clock 为相对时间条件使用的时钟，可替换"""
+    return dict([
+        add_period_func(),
+        today_func(),
+        contains_any_func(),
+        is_not_zero_func(),
+        ("Clock", Clock()),
+    ])
+
+
+def _always_true(env: Mapping[str, Any]) -> bool:
+    return True
+
+
+def _always_false(env: Mapping[str, Any]) -> bool:
+    return False
+
+
+class ConditionCompiler:
+    """
+    条件编译器
+
+    遍历一次条件树，为每个叶子条件生成由值类型处理器提供的闭包，
+    再按 AND/OR/NOT 组合为闭包树，求值时不再生成和解析表达式字符串
+    """
+
+    def __init__(self, functions: Optional[Dict[str, Callable]] = None):
+        self._handler_factory = HandlerFactory()
+        self._functions = default_functions()
+        if functions:
+            self._functions.update(functions)
+
+    @property
+    def functions(self) -> Dict[str, Callable]:
+        """编译使用的函数表（默认函数合并自定义函数）"""
+        return self._functions
+
+    def validate(self, c: Condition) -> None:
+        """检查条件中的值类型与操作符均受支持，否则抛出ValueError"""
+        self._handler_factory.validate(c)
+
+    def compile(self, c: Condition) -> EvaluateFunc:
+        """编译条件为求值闭包"""
+        # 与 ExpressionBuilder 一致：转正向表达式后简化
+        target = c.transform_forward()
+        target = target.simplify()
+
+        evaluate = self._compile(target)
+        return evaluate if evaluate is not None else _always_true
+
+    def _compile(self, c: Condition) -> Optional[EvaluateFunc]:
+        """递归编译，空叶子条件返回None"""
+        if c.is_join():
+            return self._compile_join(c)
+
+        if c.is_always_true():
+            return _always_true
+        if c.is_always_false():
+            return _always_false
+
+        if not c.field or not c.op or not c.val:
+            return None
+
+        if c.op.forward_op():
+            # 嵌套的反向操作符同样转为 not 正向操作符
+            return self._compile(c.transform_forward())
+
+        return self._compile_single(c)
+
+    def _compile_join(self, c: Condition) -> Optional[EvaluateFunc]:
+        """编译连接条件"""
+        if c.join_op == JoinOp.NOT:
+            if len(c.conditions) != 1:
+                raise ValueError("invalid condition:not join condition should have only one child")
+
+            child = self._compile(c.conditions[0])
+            if child is None:
+                return None
+
+            if c.required:
+                is_not_zero = self._functions["IsNotZero"]
+                get = field_accessor(c.conditions[0].field)
+                return lambda env: is_not_zero(get(env)) and not child(env)
+
+            return lambda env: not child(env)
+
+        children = [f for f in (self._compile(child) for child in c.conditions) if f is not None]
+        if not children:
+            return None
+        if len(children) == 1:
+            return children[0]
+
+        if c.join_op == JoinOp.AND:
+            return self._all_of(children)
+        return self._any_of(children)
+
+    def _compile_single(self, c: Condition) -> EvaluateFunc:
+        """编译单个条件"""
+        return self._handler_factory.build_evaluator(c, self._functions)
+
+    @staticmethod
+    def _all_of(children: List[EvaluateFunc]) -> EvaluateFunc:
+        if len(children) == 2:
+            first, second = children
+            return lambda env: first(env) and second(env)
+
+        def evaluate(env: Mapping[str, Any]) -> bool:
+            for child in children:
+                if not child(env):
+                    return False
+            return True
+
+        return evaluate
+
+    @staticmethod
+    def _any_of(children: List[EvaluateFunc]) -> EvaluateFunc:
+        if len(children) == 2:
+            first, second = children
+            return lambda env: first(env) or second(env)
+
+        def evaluate(env: Mapping[str, Any]) -> bool:
+            for child in children:
+                if child(env):
+                    return True
+            return False
+
+        return evaluate
+
+
+def compile_condition(c: Condition, functions: Optional[Dict[str, Callable]] = None) -> EvaluateFunc:
+    """编译条件为求值闭包"""
+    return ConditionCompiler(functions).compile(c)
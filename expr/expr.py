@@ -1,16 +1,42 @@
-from typing import List
+from itertools import product
+from typing import Iterator, List, Optional
 from condition.condition import Condition, JoinOp
 from .value_handle.factory import HandlerFactory
+from .cache import CacheInfo, LRUCache
+
+
+# 表达式缓存默认容量
+DEFAULT_EXPR_CACHE_SIZE = 1024
+
+# 表达式缓存统计
+ExprCacheInfo = CacheInfo
 
 
 class ExpressionBuilder:
-    """表达式构建器"""
+    """
+    表达式构建器
 
-    def __init__(self):
+    生成的表达式按条件结构指纹缓存（LRU），结构相同的条件只构建一次；
+    cache_size 为 0 时不缓存
+    """
+
+    def __init__(self, cache_size: int = DEFAULT_EXPR_CACHE_SIZE):
         self._handler_factory = HandlerFactory()
+        self._cache = LRUCache(cache_size)
+
+    def cache_info(self) -> ExprCacheInfo:
+        """表达式缓存命中统计"""
+        return self._cache.info()
+
+    def cache_clear(self) -> None:
+        """清空表达式缓存及统计"""
+        self._cache.clear()
 
     def build_expression(self, c: Condition) -> str:
         """构建表达式字符串"""
+        return self._cache.get_or_build(('expr', c.fingerprint()), lambda: self._build_expression(c))
+
+    def _build_expression(self, c: Condition) -> str:
         # 简化条件
         target = c.transform_forward()
         target = target.simplify()
@@ -60,20 +86,11 @@ class ExpressionBuilder:
         """构建单个条件表达式"""
         result.append("(")
 
-        # 获取对应的值类型处理器
-        handler = self._handler_factory.get_handler(c.val_type)
-        if handler:
-            handler.build_expression(c, result)
-        else:
-            # 处理其他值类型或抛出异常
-            self._build_default_expression(c, result)
+        # 按值类型分发到处理器，未支持的值类型或操作符抛出异常
+        self._handler_factory.build_expression(c, result)
 
         result.append(")")
 
-    def _build_default_expression(self, c: Condition, result: List[str]) -> None:
-        """默认表达式构建（处理未支持的值类型）"""
-        raise ValueError(f"Unsupported value type: {c.val_type}")
-
     def build_expressions_with_or_split(self, c: Condition) -> List[str]:
         """
         构建表达式，当遇到 OR 操作符时进行拆分，返回多个表达式
@@ -84,57 +101,125 @@ class ExpressionBuilder:
         Returns:
             List[str]: 拆分后的表达式列表
         """
+        parts = self._cache.get_or_build(('split', c.fingerprint()),
+                             lambda: tuple(self._build_split_expr(part) for part in self.split_or(c)))
+        return list(parts)
+
+    def iter_expressions_with_or_split(self, c: Condition, max_branches: Optional[int] = None,
+                                       fallback: bool = False) -> Iterator[str]:
+        """
+        按 OR 拆分并逐个生成表达式，参数同 iter_split_or
+        """
+        return map(self._build_split_expr, self.iter_split_or(c, max_branches, fallback))
+
+    def split_or(self, c: Condition) -> List[Condition]:
+        """
+        拆分 OR 条件，返回多个只含 AND/NOT 的合取条件，任一合取条件成立即原条件成立
+
+        Args:
+            c: Condition 条件对象
+
+        Returns:
+            List[Condition]: 拆分后的条件列表
+        """
+        return list(self.iter_split_or(c))
+
+    def iter_split_or(self, c: Condition, max_branches: Optional[int] = None,
+                      fallback: bool = False) -> Iterator[Condition]:
+        """
+        惰性拆分 OR 条件，逐个生成去重后的合取条件
+
+        拆分前先计算分支数（AND 下各 OR 分支数之积），超过 max_branches 时：
+        fallback 为 True 则不拆分，生成简化后的原条件；否则抛出 OrSplitLimitError
+
+        Args:
+            c: Condition 条件对象
+            max_branches: 分支数上限，None 表示不限制
+            fallback: 超过上限时是否回退为不拆分
+
+        Returns:
+            Iterator[Condition]: 合取条件迭代器
+        """
         # 转正向表达式
         target = c.transform_forward()
         # 简化条件
         target = target.simplify()
 
-        return self._recursive_split_or(target)
+        # 分支数在调用时检查，超限立即抛出而非等到首次迭代
+        if max_branches is not None:
+            branches = count_or_branches(target)
+            if branches > max_branches:
+                if not fallback:
+                    raise OrSplitLimitError(branches, max_branches)
+                return iter([target])
+
+        return self._iter_unique(self._iter_split_or(target))
+
+    @staticmethod
+    def _iter_unique(parts: Iterator[Condition]) -> Iterator[Condition]:
+        """去除结构相同的合取条件"""
+        seen = set()
+        for part in parts:
+            if part in seen:
+                continue
+            seen.add(part)
+            yield part
+
+    def _build_split_expr(self, c: Condition) -> str:
+        result = []
+        self._build_expr(c, result)
+        return ''.join(result)
 
-    def _recursive_split_or(self, c: Condition) -> List[str]:
+    def _iter_split_or(self, c: Condition) -> Iterator[Condition]:
         """
-        递归拆分OR表达式
+        递归拆分OR条件
         """
         if not c.is_join():
             # 叶子节点
-            result = []
-            self._build_expr(c, result)
-            return [''.join(result)]
+            yield c
+            return
 
         if c.join_op != JoinOp.AND:
             # 对于OR和NOT操作符，直接递归处理
             if c.join_op == JoinOp.OR:
-                expressions = []
                 for child in c.conditions:
-                    expressions.extend(self._recursive_split_or(child))
-                return expressions
+                    yield from self._iter_split_or(child)
             else:  # NOT操作符
-                result = []
-                self._build_expr(c, result)
-                return [''.join(result)]
+                yield c
+            return
 
         # AND操作符处理
-        # 检查是否有OR子条件需要拆分
-        all_splits = []
-        for child in c.conditions:
-            child_splits = self._recursive_split_or(child)
-            all_splits.append(child_splits)
+        # 各子条件的拆分结果需要反复组合，先展开；组合本身惰性生成
+        all_splits = [list(self._iter_split_or(child)) for child in c.conditions]
 
         # 笛卡尔积组合
-        from itertools import product
-        result = []
         for combination in product(*all_splits):
-            # 构建新的AND表达式
-            expr_parts = []
-            for i, part in enumerate(combination):
-                if i > 0:
-                    expr_parts.append(JoinOp.AND.code())
-                expr_parts.append(part)
+            # 构建新的AND条件，子条件共享不再拷贝
+            if len(combination) > 1:
+                yield Condition(join_op=JoinOp.AND, conditions=list(combination))
+            else:
+                yield combination[0]
+
+
+class OrSplitLimitError(ValueError):
+    """OR 拆分分支数超过上限"""
 
-            final_expr = f"({''.join(expr_parts)})" if len(expr_parts) > 1 else expr_parts[0]
-            result.append(final_expr)
+    def __init__(self, branches: int, max_branches: int):
+        super().__init__(f"or split produces {branches} branches, exceeds limit {max_branches}")
+        self.branches = branches
+        self.max_branches = max_branches
 
-        return result
+
+def count_or_branches(c: Condition) -> int:
+    """不展开条件，计算按 OR 拆分后的分支数（去重前）"""
+    if not c.is_join() or c.join_op == JoinOp.NOT:
+        return 1
+    if c.join_op == JoinOp.OR:
+        return sum(count_or_branches(child) for child in c.conditions)
+    branches = 1
+    for child in c.conditions:
+        branches *= count_or_branches(child)
+    return branches
 
 
 # 全局表达式构建器实例
@@ -148,3 +233,16 @@ def expr(c: Condition) -> str:
 def expr_with_or_split(c: Condition) -> list[str]:
     """生成expr表达式"""
     return _builder.build_expressions_with_or_split(c)
+
+def iter_expr_with_or_split(c: Condition, max_branches: Optional[int] = None,
+                            fallback: bool = False) -> Iterator[str]:
+    """惰性生成按 OR 拆分的expr表达式，超过分支上限时回退或抛出 OrSplitLimitError"""
+    return _builder.iter_expressions_with_or_split(c, max_branches, fallback)
+
+def expr_cache_info() -> ExprCacheInfo:
+    """全局表达式构建器的缓存命中统计"""
+    return _builder.cache_info()
+
+def conditions_with_or_split(c: Condition) -> list[Condition]:
+    """按 OR 拆分条件为多个合取条件"""
+    return _builder.split_or(c)
@@ -1,5 +1,5 @@
 from .factory import HandlerFactory
-from .base_handler import ValueHandler
+from .base_handler import ValueHandler, OpBuilders
 from .int_handler import IntHandler
 from .string_handler import StringHandler
 from .float_handler import FloatHandler
@@ -14,6 +14,7 @@ from .bi_crowd_handler import BICrowdHandler
 __all__ = [
     'HandlerFactory',
     'ValueHandler',
+    'OpBuilders',
     'IntHandler',
     'StringHandler',
     'FloatHandler',
@@ -1,21 +1,111 @@
+import operator
 from abc import ABC, abstractmethod
-from typing import List, Any
+from typing import List, Any, Callable, Dict, FrozenSet, Iterable, Mapping, NamedTuple, Optional, Tuple
+from condition.keyword_matcher import KeywordMatcher
+from condition.op import Op
 from condition.var import ValType
 from condition.condition import Condition
 
+# 比较操作符与python运算函数的映射
+_COMPARE_OPS: Dict[Op, Callable[[Any, Any], bool]] = {
+    Op.EQ: operator.eq,
+    Op.NE: operator.ne,
+    Op.LT: operator.lt,
+    Op.LTE: operator.le,
+    Op.GT: operator.gt,
+    Op.GTE: operator.ge,
+}
+
+# 处理器声明支持的操作符时常用的组合
+COMPARE_OPS: FrozenSet[Op] = frozenset({Op.EQ, Op.LT, Op.LTE, Op.GT, Op.GTE})
+RANGE_OPS: FrozenSet[Op] = frozenset({Op.LT, Op.LTE, Op.GT, Op.GTE})
+
+
+def field_accessor(field: str) -> Callable[[Mapping[str, Any]], Any]:
+    """
+    生成字段取值函数
+
+    字段以 () 结尾时视为方法调用，环境中的值可调用时调用它，否则直接返回已解析的值
+    """
+    if field.endswith("()"):
+        name = field[:-2]
+
+        def get_method_value(env: Mapping[str, Any]) -> Any:
+            value = env[name]
+            return value() if callable(value) else value
+
+        return get_method_value
+
+    return operator.itemgetter(field)
+
+
+def field_env_name(field: str) -> str:
+    """字段在求值环境（或列式批次）中的名称，方法调用去掉 ()"""
+    return field[:-2] if field.endswith("()") else field
+
+
+class OpBuilders(NamedTuple):
+    """
+    单个操作符的构建函数，入参第一个为处理器实例
+
+    expression(handler, c, result) 写入表达式；evaluator(handler, c, functions) 返回求值闭包；
+    batch(handler, c, functions) 返回向量化闭包或None，为None时该操作符不支持向量化
+    """
+    expression: Callable[..., None]
+    evaluator: Callable[..., Callable[[Mapping[str, Any]], bool]]
+    batch: Optional[Callable[..., Optional[Callable[[Mapping[str, Any]], Any]]]] = None
+
 
 class ValueHandler(ABC):
-    """值类型处理器抽象基类"""
+    """
+    值类型处理器抽象基类
+
+    子类声明处理的值类型 val_types，以及 操作符 -> OpBuilders 的分发表 builders；
+    支持的操作符 ops 由 builders 的键生成，注册到 HandlerFactory 与构建叶子使用同一张表。
+    未声明 builders 的子类可以直接声明 ops 并重写各构建方法
+    """
+
+    val_types: Tuple[ValType, ...] = ()
+    builders: Dict[Op, OpBuilders] = {}
+    ops: FrozenSet[Op] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'builders' in cls.__dict__:
+            cls.ops = frozenset(cls.builders)
 
-    @abstractmethod
     def supports(self, val_type: ValType) -> bool:
         """判断是否支持该值类型"""
+        return val_type in self.val_types
+
+    def validate(self, c: Condition) -> None:
+        """检查操作符以外的条件参数（如相对时间单位），不合法时抛出ValueError"""
         pass
 
-    @abstractmethod
     def build_expression(self, c: Condition, result: List[str]) -> None:
         """构建表达式"""
-        pass
+        self._op_builders(c).expression(self, c, result)
+
+    def build_evaluator(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        """构建叶子条件的求值闭包，闭包入参为字段环境"""
+        return self._op_builders(c).evaluator(self, c, functions)
+
+    def build_batch_evaluator(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        """
+        构建叶子条件的向量化求值闭包，闭包入参为 字段名 -> numpy列，返回布尔掩码
+
+        返回None表示该条件不支持向量化，由批量编译器回退为逐行求值
+        """
+        builders = self.builders.get(c.op)
+        if builders is None or builders.batch is None:
+            return None
+        return builders.batch(self, c, functions)
+
+    def _op_builders(self, c: Condition) -> OpBuilders:
+        builders = self.builders.get(c.op)
+        if builders is None:
+            raise self._unsupported_error(c)
+        return builders
 
     @abstractmethod
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
@@ -27,3 +117,80 @@ class ValueHandler(ABC):
         # if field.endswith("()"):
         #     return field[:-2]
         return field
+
+    def _get_field_accessor(self, field: str) -> Callable[[Mapping[str, Any]], Any]:
+        """获取字段取值函数，处理方法调用"""
+        return field_accessor(field)
+
+    def _compare_evaluator(self, c: Condition, expected: Any) -> Callable[[Mapping[str, Any]], bool]:
+        """构建 字段 op 常量 的比较闭包"""
+        get = self._get_field_accessor(c.field)
+        compare = _COMPARE_OPS[c.op]
+        return lambda env: compare(get(env), expected)
+
+    def _in_evaluator(self, c: Condition, expected: Iterable[Any]) -> Callable[[Mapping[str, Any]], bool]:
+        """构建 字段 in 常量列表 的闭包，常量列表编译期转为 frozenset，求值为一次哈希探测"""
+        get = self._get_field_accessor(c.field)
+        expected_set = frozenset(expected)
+
+        def evaluate(env: Mapping[str, Any]) -> bool:
+            try:
+                return get(env) in expected_set
+            except TypeError:
+                # 不可哈希的值（如列表）不会等于列表中的任一常量
+                return False
+
+        return evaluate
+
+    def _contains_any_evaluator(self, c: Condition, expected: Iterable[Any]) -> Callable[[Mapping[str, Any]], bool]:
+        """构建 ContainsAny(字段, 常量列表, keyword) 的闭包，语义与 contains_any_func 一致"""
+        get = self._get_field_accessor(c.field)
+        if c.keyword:
+            # 关键词模式编译期构建多关键词匹配器，求值时单次扫描文本
+            matcher = KeywordMatcher(expected)
+            return lambda env: matcher(get(env))
+
+        # 非关键词模式按字符串比较，编译期转为 frozenset，多值字段只需一次 isdisjoint
+        expected_set = frozenset(str(e) for e in expected)
+
+        def evaluate(env: Mapping[str, Any]) -> bool:
+            value = get(env)
+            if hasattr(value, '__iter__'):
+                return not expected_set.isdisjoint(map(str, value))
+            return str(value) in expected_set
+
+        return evaluate
+
+    def _write_compare(self, c: Condition, result: List[str], value: str) -> None:
+        """写入 字段 op 值 的表达式"""
+        result.append(self._get_field_expression(c.field))
+        result.append(c.op.code())
+        result.append(value)
+
+    def _write_in(self, c: Condition, result: List[str], values: str) -> None:
+        """写入 字段 in 列表 的表达式"""
+        result.append(self._get_field_expression(c.field))
+        result.append(" ")
+        result.append(c.op.code())
+        result.append(" ")
+        result.append(values)
+
+    def _write_contains_any(self, c: Condition, result: List[str], values: str) -> None:
+        """写入 ContainsAny(字段, 列表, keyword) 的表达式"""
+        result.append("ContainsAny(")
+        result.append(self._get_field_expression(c.field))
+        result.append(", ")
+        result.append(values)
+        result.append(", ")
+        result.append(str(c.keyword).lower())
+        result.append(")")
+
+    def _compare_batch_evaluator(self, c: Condition, expected: Any) -> Callable[[Mapping[str, Any]], Any]:
+        """构建 字段列 op 常量 的向量化比较闭包"""
+        column = field_env_name(c.field)
+        compare = _COMPARE_OPS[c.op]
+        return lambda columns: compare(columns[column], expected)
+
+    def _unsupported_error(self, c: Condition) -> ValueError:
+        """不支持的操作符错误"""
+        return ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type!r}")
@@ -1,26 +1,23 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
 from condition.values import unquote
-from .base_handler import ValueHandler
+from .base_handler import ValueHandler, OpBuilders
 
 
 class BoolHandler(ValueHandler):
     """布尔值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.BOOL
+    val_types = (ValType.BOOL,)
 
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
+    def _expression_eq(self, c: Condition, result: List[str]) -> None:
+        self._write_compare(c, result, unquote(c.val))
 
-        if c.op == Op.EQ:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append(unquote(c.val))
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    def _evaluator_eq(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._compare_evaluator(c, unquote(c.val).lower() in ("true", "1"))
+
+    builders = {Op.EQ: OpBuilders(_expression_eq, _evaluator_eq)}
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
 
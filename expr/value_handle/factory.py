@@ -1,6 +1,7 @@
-from typing import List, Optional, Any
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, Optional
 
 from condition import Condition
+from condition.op import Op
 from condition.var import ValType
 from .base_handler import ValueHandler
 from .int_handler import IntHandler
@@ -16,10 +17,16 @@ from .bi_crowd_handler import BICrowdHandler
 
 
 class HandlerFactory:
-    """处理器工厂"""
+    """
+    处理器工厂
+
+    按值类型建立处理器分发表，查找为一次字典访问；处理器支持的操作符来自其 builders 分发表，
+    不支持的 (值类型, 操作符) 在 validate 或构建叶子时统一报错
+    """
 
     def __init__(self):
-        self._handlers: List[ValueHandler] = [
+        self._handlers: Dict[ValType, ValueHandler] = {}
+        for handler in [
             IntHandler(),
             StringHandler(),
             FloatHandler(),
@@ -30,22 +37,75 @@ class HandlerFactory:
             VarHandler(),
             GroupHandler(),
             BICrowdHandler()
-        ]
+        ]:
+            self.register_handler(handler)
 
     def get_handler(self, val_type: ValType) -> Optional[ValueHandler]:
         """根据值类型获取对应的处理器"""
-        for handler in self._handlers:
-            if handler.supports(val_type):
-                return handler
-        return None
+        return self._handlers.get(val_type)
+
+    def register_handler(self, handler: ValueHandler, replace: bool = False) -> None:
+        """
+        注册新的处理器
+
+        值类型取处理器声明的 val_types，未声明时按 supports() 推断；操作符取 builders 的键（即 ops），
+        都未声明的处理器视为支持所有操作符，由其构建方法自行报错。值类型已注册且 replace 为 False 时抛出ValueError
+        """
+        val_types = tuple(handler.val_types) or tuple(t for t in ValType if handler.supports(t))
+        if not val_types:
+            raise ValueError(f"handler {type(handler).__name__} supports no val type")
+        if not replace:
+            for val_type in val_types:
+                if val_type in self._handlers:
+                    raise ValueError(f"val type {val_type!r} already has handler "
+                                     f"{type(self._handlers[val_type]).__name__}")
+
+        for val_type in val_types:
+            self._handlers[val_type] = handler
+
+    def supported_ops(self, val_type: ValType) -> FrozenSet[Op]:
+        """值类型支持的操作符，未注册的值类型返回空集合"""
+        handler = self._handlers.get(val_type)
+        if handler is None:
+            return frozenset()
+        return frozenset(handler.ops) or frozenset(Op)
+
+    def validate(self, c: Condition) -> None:
+        """检查条件树中所有叶子的 (值类型, 操作符) 均受支持且参数合法，否则抛出ValueError"""
+        if c.is_join():
+            for child in c.conditions:
+                self.validate(child)
+            return
+        if not c.field or not c.op or not c.val:
+            return
+        # 不等于等反向操作符按正向操作符求值
+        self._leaf_handler(c, c.op.forward_op() or c.op)
+
+    def build_expression(self, c: Condition, result: List[str]) -> None:
+        """构建叶子条件的表达式"""
+        self._leaf_handler(c).build_expression(c, result)
+
+    def build_evaluator(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        """构建叶子条件的求值闭包"""
+        return self._leaf_handler(c).build_evaluator(c, functions)
+
+    def build_batch_evaluator(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        """构建叶子条件的向量化求值闭包，不支持向量化时返回None"""
+        return self._leaf_handler(c).build_batch_evaluator(c, functions)
 
-    def register_handler(self, handler: ValueHandler) -> None:
-        """注册新的处理器"""
-        self._handlers.append(handler)
+    def _leaf_handler(self, c: Condition, op: Optional[Op] = None) -> ValueHandler:
+        handler = self._handlers.get(c.val_type)
+        if handler is None:
+            raise ValueError(f"Unsupported value type: {c.val_type}")
+        op = op or c.op
+        if handler.ops and op not in handler.ops:
+            raise ValueError(f"invalid condition:unsupported op {op} for val type {c.val_type!r}")
+        handler.validate(c)
+        return handler
 
     def get_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
         """根据条件和实际值生成建议"""
         handler = self.get_handler(condition.val_type)
         if handler:
             return handler.generate_suggestions(condition, actual_value)
-        return ["未知类型，无法提供具体建议"]
\ No newline at end of file
+        return ["未知类型，无法提供具体建议"]
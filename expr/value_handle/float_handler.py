@@ -1,26 +1,26 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping, Optional
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
 from condition.values import unquote
-from .base_handler import ValueHandler
+from .base_handler import ValueHandler, OpBuilders, RANGE_OPS
 
 
 class FloatHandler(ValueHandler):
     """浮点数值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.FLOAT
+    val_types = (ValType.FLOAT,)
 
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
+    def _expression_compare(self, c: Condition, result: List[str]) -> None:
+        self._write_compare(c, result, unquote(c.val))
 
-        if c.op in [Op.LT, Op.LTE, Op.GT, Op.GTE]:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append(unquote(c.val))
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    def _evaluator_compare(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._compare_evaluator(c, float(unquote(c.val)))
+
+    def _batch_compare(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        return self._compare_batch_evaluator(c, float(unquote(c.val)))
+
+    builders = dict.fromkeys(RANGE_OPS, OpBuilders(_expression_compare, _evaluator_compare, _batch_compare))
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
 
@@ -1,34 +1,51 @@
-from typing import List, Any
+import ast
+from typing import List, Any, Callable, Dict, Mapping
 import json
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
-from .base_handler import ValueHandler
+from .base_handler import ValueHandler, OpBuilders
 
 
 class GroupHandler(ValueHandler):
     """群组值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.GROUP
-
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
-
-        if c.op == Op.IN:
-            result.append("InGroups(Context, ")
-            result.append(field_expr)
-            result.append(", ")
-            values = json.loads(c.val)
-            for i, value in enumerate(values):
-                if i > 0:
-                    result.append(", ")
-                result.append("[")
-                result.append(value)
-                result.append("]")
-            result.append(")")
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    val_types = (ValType.GROUP,)
+    def _expression_in(self, c: Condition, result: List[str]) -> None:
+        result.append("InGroups(Context, ")
+        result.append(self._get_field_expression(c.field))
+        result.append(", ")
+        values = json.loads(c.val)
+        for i, value in enumerate(values):
+            if i > 0:
+                result.append(", ")
+            result.append("[")
+            result.append(value)
+            result.append("]")
+        result.append(")")
+
+    def _evaluator_in(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        get = self._get_field_accessor(c.field)
+        group_params = [self._parse_group_params(value, functions) for value in json.loads(c.val)]
+        in_groups = functions["InGroups"]
+
+        def evaluate(env: Mapping[str, Any]) -> bool:
+            result, err = in_groups(env.get("Context") or functions.get("Context"), get(env), *group_params)
+            if err:
+                raise err
+            return result
+
+        return evaluate
+
+    builders = {Op.IN: OpBuilders(_expression_in, _evaluator_in)}
+
+    def _parse_group_params(self, value: str, functions: Dict[str, Callable]) -> List[Any]:
+        """编译期解析群组参数，参数中含函数调用(如date)时借助functions求值一次"""
+        source = f"[{value}]"
+        try:
+            return ast.literal_eval(source)
+        except (ValueError, SyntaxError):
+            return eval(source, {"__builtins__": {}, **functions})
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
 
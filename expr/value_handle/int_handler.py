@@ -1,40 +1,52 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping, Optional
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
-from condition.values import unquote, val_to_int64_slice
-from .base_handler import ValueHandler
+from condition.values import unquote, parse_int64_literal, val_to_int64_slice
+from .base_handler import ValueHandler, OpBuilders, COMPARE_OPS, RANGE_OPS, field_env_name
+from .vector import as_array, isin
 
 
 class IntHandler(ValueHandler):
     """整数值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.INT
-
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = c.field
-
-        if c.op in [Op.EQ, Op.LT, Op.LTE, Op.GT, Op.GTE]:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append(unquote(c.val))
-        elif c.op == Op.IN:
-            result.append(field_expr)
-            result.append(" ")
-            result.append(c.op.code())
-            result.append(" ")
-            self._write_int_slice_for_expr(result, c.val)
-        elif c.op == Op.CONTAINS_ANY:
-            result.append("ContainsAny(")
-            result.append(field_expr)
-            result.append(", ")
-            self._write_int_slice_for_expr(result, c.val)
-            result.append(", ")
-            result.append(str(c.keyword).lower())
-            result.append(")")
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    val_types = (ValType.INT,)
+
+    def _expression_compare(self, c: Condition, result: List[str]) -> None:
+        self._write_compare(c, result, unquote(c.val))
+
+    def _expression_in(self, c: Condition, result: List[str]) -> None:
+        self._write_in(c, result, self._int_slice_expr(c.val))
+
+    def _expression_contains_any(self, c: Condition, result: List[str]) -> None:
+        self._write_contains_any(c, result, self._int_slice_expr(c.val))
+
+    def _evaluator_compare(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._compare_evaluator(c, int(unquote(c.val)))
+
+    def _evaluator_in(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._in_evaluator(c, parse_int64_literal(c.val))
+
+    def _evaluator_contains_any(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._contains_any_evaluator(c, parse_int64_literal(c.val))
+
+    def _batch_compare(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        return self._compare_batch_evaluator(c, int(unquote(c.val)))
+
+    def _batch_in(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        column = field_env_name(c.field)
+        expected = as_array(parse_int64_literal(c.val))
+        return lambda columns: isin(columns[column], expected)
+
+    def _batch_contains_any(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        # 关键词模式按子串匹配，不支持向量化
+        return None if c.keyword else self._batch_in(c, functions)
+
+    builders = {
+        **dict.fromkeys(COMPARE_OPS, OpBuilders(_expression_compare, _evaluator_compare, _batch_compare)),
+        Op.IN: OpBuilders(_expression_in, _evaluator_in, _batch_in),
+        Op.CONTAINS_ANY: OpBuilders(_expression_contains_any, _evaluator_contains_any, _batch_contains_any),
+    }
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
         suggestions = []
@@ -45,7 +57,7 @@ class IntHandler(ValueHandler):
             elif condition.op == Op.CONTAINS_ANY:
                 expected_values = val_to_int64_slice(condition.val)
                 suggestions.append(f"将值改为 {expected_values} 中的任意一个")
-            elif condition.op in [Op.GT, Op.GTE, Op.LT, Op.LTE]:
+            elif condition.op in RANGE_OPS:
                 expected_val = int(condition.val)
                 suggestions.append(f"调整值以满足 {condition.op.code()} {expected_val}")
         except Exception:
@@ -53,44 +65,7 @@ class IntHandler(ValueHandler):
 
         return suggestions
 
-    def _write_int_slice_for_expr(self, result: List[str], val: str) -> None:
-        """写入整数切片到表达式"""
-        int_slice = val_to_int64_slice(val)
-        result.append("[")
-        for i, e in enumerate(int_slice):
-            if i > 0:
-                result.append(",")
-            result.append(str(e))
-        result.append("]")
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    @staticmethod
+    def _int_slice_expr(val: str) -> str:
+        """整数切片的表达式"""
+        return "[" + ",".join(map(str, parse_int64_literal(val))) + "]"
@@ -1,42 +1,54 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping, Optional
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
-from condition.values import unquote
-from .base_handler import ValueHandler
+from condition.values import unquote, parse_string_literal
+from .base_handler import ValueHandler, OpBuilders, COMPARE_OPS, RANGE_OPS, field_env_name
+from .vector import as_array, isin
 
 
 class StringHandler(ValueHandler):
     """字符串值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.STRING
-
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
-
-        if c.op in [Op.EQ, Op.LT, Op.LTE, Op.GT, Op.GTE]:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append("\"")
-            result.append(unquote(c.val))
-            result.append("\"")
-        elif c.op == Op.IN:
-            result.append(field_expr)
-            result.append(" ")
-            result.append(c.op.code())
-            result.append(" ")
-            result.append(c.val)
-        elif c.op == Op.CONTAINS_ANY:
-            result.append("ContainsAny(")
-            result.append(field_expr)
-            result.append(", ")
-            result.append(c.val)
-            result.append(", ")
-            result.append(str(c.keyword).lower())
-            result.append(")")
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    val_types = (ValType.STRING,)
+
+    def _expression_compare(self, c: Condition, result: List[str]) -> None:
+        self._write_compare(c, result, "\"" + unquote(c.val) + "\"")
+
+    def _expression_in(self, c: Condition, result: List[str]) -> None:
+        self._write_in(c, result, c.val)
+
+    def _expression_contains_any(self, c: Condition, result: List[str]) -> None:
+        self._write_contains_any(c, result, c.val)
+
+    def _evaluator_compare(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._compare_evaluator(c, unquote(c.val))
+
+    def _evaluator_in(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._in_evaluator(c, parse_string_literal(c.val))
+
+    def _evaluator_contains_any(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._contains_any_evaluator(c, parse_string_literal(c.val))
+
+    def _batch_eq(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        return self._compare_batch_evaluator(c, unquote(c.val))
+
+    def _batch_in(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        column = field_env_name(c.field)
+        expected = as_array(parse_string_literal(c.val))
+        return lambda columns: isin(columns[column], expected)
+
+    def _batch_contains_any(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        # 关键词模式按子串匹配，不支持向量化
+        return None if c.keyword else self._batch_in(c, functions)
+
+    # 字符串大小比较不做向量化，只有 EQ 提供向量化闭包
+    builders = {
+        **dict.fromkeys(COMPARE_OPS, OpBuilders(_expression_compare, _evaluator_compare)),
+        Op.EQ: OpBuilders(_expression_compare, _evaluator_compare, _batch_eq),
+        Op.IN: OpBuilders(_expression_in, _evaluator_in, _batch_in),
+        Op.CONTAINS_ANY: OpBuilders(_expression_contains_any, _evaluator_contains_any, _batch_contains_any),
+    }
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
         """生成字符串类型的建议"""
@@ -60,11 +72,8 @@ class StringHandler(ValueHandler):
             if hasattr(condition, 'val_list'):
                 expected_values = condition.val_list
             else:
-                # 解析 val 字符串为列表
-                try:
-                    expected_values = eval(condition.val) if condition.val else []
-                except:
-                    expected_values = [condition.val] if condition.val else []
+                # 解析 val 字符串为列表（带缓存）
+                expected_values = list(parse_string_literal(condition.val))
 
             matched = [val for val in expected_values if val in actual_str]
             unmatched = [val for val in expected_values if val not in actual_str]
@@ -75,17 +84,14 @@ class StringHandler(ValueHandler):
                 suggestions.append(f"未匹配的值: {unmatched}")
 
         elif condition.op == Op.IN:
-            try:
-                expected_list = eval(condition.val) if condition.val else []
-            except:
-                expected_list = [condition.val] if condition.val else []
+            expected_list = list(parse_string_literal(condition.val))
 
             if actual_str not in expected_list:
                 suggestions.append(f"值 '{actual_str}' 不在允许的列表 {expected_list} 中")
             else:
                 suggestions.append(f"值 '{actual_str}' 在允许的列表中")
 
-        elif condition.op in [Op.LT, Op.LTE, Op.GT, Op.GTE]:
+        elif condition.op in RANGE_OPS:
             suggestions.append(f"比较操作失败: '{actual_str}' 与 '{expected_str}'")
             try:
                 # 尝试数值比较
@@ -1,26 +1,40 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping, Optional
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
 from condition.values import unquote
-from .base_handler import ValueHandler
+from condition.period import check_period_unit
+from ..clock import relative_bound
+from .base_handler import ValueHandler, OpBuilders, COMPARE_OPS, _COMPARE_OPS, field_env_name
+from .vector import to_epoch, epoch
 
 
 class TimeBeforeHandler(ValueHandler):
     """之前时间值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.TIME_BEFORE
+    val_types = (ValType.TIME_BEFORE,)
 
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
+    def validate(self, c: Condition) -> None:
+        check_period_unit(c.period_unit)
 
-        if c.op in [Op.EQ, Op.LT, Op.LTE, Op.GT, Op.GTE]:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append(f"AddPeriod(now(), -{unquote(c.val)}, {c.period_unit})")
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    def _expression_compare(self, c: Condition, result: List[str]) -> None:
+        self._write_compare(c, result, f"AddPeriod(now(), -{unquote(c.val)}, {c.period_unit})")
+
+    def _evaluator_compare(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        get = self._get_field_accessor(c.field)
+        compare = _COMPARE_OPS[c.op]
+        # 相对边界由时钟解析，同一批次（时钟快照）内只计算一次
+        bound = relative_bound(functions["Clock"], functions["AddPeriod"], -int(unquote(c.val)), c.period_unit)
+        return lambda env: compare(get(env), bound())
+
+    def _batch_compare(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        column = field_env_name(c.field)
+        compare = _COMPARE_OPS[c.op]
+        bound = relative_bound(functions["Clock"], functions["AddPeriod"], -int(unquote(c.val)), c.period_unit)
+        # 每个批次只计算一次相对时间边界
+        return lambda columns: compare(to_epoch(columns[column]), epoch(bound()))
+
+    builders = dict.fromkeys(COMPARE_OPS, OpBuilders(_expression_compare, _evaluator_compare, _batch_compare))
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
 
@@ -1,31 +1,32 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping, Optional
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
-from .base_handler import ValueHandler
+from condition.values import val_to_time
+from .base_handler import ValueHandler, OpBuilders, COMPARE_OPS, _COMPARE_OPS, field_env_name
+from .vector import to_epoch, epoch
 
 
 class TimeHandler(ValueHandler):
     """时间值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.TIME
-
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
-
-        if c.op in [Op.EQ, Op.LT, Op.LTE, Op.GT, Op.GTE]:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append("date(")
-            if not c.val.startswith("\""):
-                result.append("\"")
-            result.append(c.val)
-            if not c.val.endswith("\""):
-                result.append("\"")
-            result.append(")")
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
+    val_types = (ValType.TIME,)
+
+    def _expression_compare(self, c: Condition, result: List[str]) -> None:
+        value = c.val if c.val.startswith("\"") else "\"" + c.val
+        value = value if c.val.endswith("\"") else value + "\""
+        self._write_compare(c, result, f"date({value})")
+
+    def _evaluator_compare(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        return self._compare_evaluator(c, val_to_time(c.val))
+
+    def _batch_compare(self, c: Condition, functions: Dict[str, Callable]) -> Optional[Callable[[Mapping[str, Any]], Any]]:
+        column = field_env_name(c.field)
+        compare = _COMPARE_OPS[c.op]
+        expected = epoch(val_to_time(c.val))
+        return lambda columns: compare(to_epoch(columns[column]), expected)
+
+    builders = dict.fromkeys(COMPARE_OPS, OpBuilders(_expression_compare, _evaluator_compare, _batch_compare))
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
 
@@ -1,53 +1,55 @@
-from typing import List, Any
+from typing import List, Any, Callable, Dict, Mapping
 from condition.op import  Op
 from condition.var import ValType
 from condition.condition import Condition
-from condition.values import unquote, val_to_string_slice
-from .base_handler import ValueHandler
+from condition.values import unquote, parse_string_literal
+from .base_handler import ValueHandler, OpBuilders, COMPARE_OPS, _COMPARE_OPS
 
 
 class VarHandler(ValueHandler):
     """变量值处理器"""
 
-    def supports(self, val_type: ValType) -> bool:
-        return val_type == ValType.VAR
-
-    def build_expression(self, c: Condition, result: List[str]) -> None:
-        field_expr = self._get_field_expression(c.field)
-
-        if c.op in [Op.EQ, Op.LT, Op.LTE, Op.GT, Op.GTE]:
-            result.append(field_expr)
-            result.append(c.op.code())
-            result.append(unquote(c.val))
-        elif c.op == Op.IN:
-            result.append(field_expr)
-            result.append(" ")
-            result.append(c.op.code())
-            result.append(" ")
-            self._write_var_slice_for_expr(result, c.val)
-        elif c.op == Op.CONTAINS_ANY:
-            result.append("ContainsAny(")
-            result.append(field_expr)
-            result.append(", ")
-            self._write_var_slice_for_expr(result, c.val)
-            result.append(", ")
-            result.append(str(c.keyword).lower())
-            result.append(")")
-        else:
-            raise ValueError(f"invalid condition:unsupported op {c.op} for val type {c.val_type.text()}")
-
-    def _write_var_slice_for_expr(self, result: List[str], val: str) -> None:
-        """写入变量切片到表达式"""
+    val_types = (ValType.VAR,)
+    def _expression_compare(self, c: Condition, result: List[str]) -> None:
+        self._write_compare(c, result, unquote(c.val))
+
+    def _expression_in(self, c: Condition, result: List[str]) -> None:
+        self._write_in(c, result, self._var_slice_expr(c.val))
+
+    def _expression_contains_any(self, c: Condition, result: List[str]) -> None:
+        self._write_contains_any(c, result, self._var_slice_expr(c.val))
+
+    def _evaluator_compare(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        get = self._get_field_accessor(c.field)
+        compare = _COMPARE_OPS[c.op]
+        get_var = self._get_field_accessor(unquote(c.val))
+        return lambda env: compare(get(env), get_var(env))
+
+    def _evaluator_in(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        get = self._get_field_accessor(c.field)
+        get_vars = [self._get_field_accessor(e) for e in parse_string_literal(c.val)]
+        return lambda env: get(env) in [get_var(env) for get_var in get_vars]
+
+    def _evaluator_contains_any(self, c: Condition, functions: Dict[str, Callable]) -> Callable[[Mapping[str, Any]], bool]:
+        get = self._get_field_accessor(c.field)
+        get_vars = [self._get_field_accessor(e) for e in parse_string_literal(c.val)]
+        keyword = c.keyword
+        contains_any = functions["ContainsAny"]
+        return lambda env: contains_any(get(env), [get_var(env) for get_var in get_vars], keyword)
+
+    builders = {
+        **dict.fromkeys(COMPARE_OPS, OpBuilders(_expression_compare, _evaluator_compare)),
+        Op.IN: OpBuilders(_expression_in, _evaluator_in),
+        Op.CONTAINS_ANY: OpBuilders(_expression_contains_any, _evaluator_contains_any),
+    }
+
+    @staticmethod
+    def _var_slice_expr(val: str) -> str:
+        """变量切片的表达式"""
         try:
-            str_slice = val_to_string_slice(val)
-            result.append("[")
-            for i, e in enumerate(str_slice):
-                if i > 0:
-                    result.append(",")
-                result.append(e)
-            result.append("]")
+            return "[" + ",".join(parse_string_literal(val)) + "]"
         except:
-            result.append(val)
+            return val
 
     def generate_suggestions(self, condition: Condition, actual_value: Any) -> List[str]:
 
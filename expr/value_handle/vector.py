@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Any, Iterable, List
+
+try:
+    import numpy as np
+except ImportError:  # numpy 为可选依赖，仅批量向量化求值时需要
+    np = None
+
+
+def require_numpy() -> None:
+    """检查numpy是否可用"""
+    if np is None:
+        raise ImportError("vectorized batch evaluation requires numpy, please install numpy")
+
+
+def to_column(values: List[Any]) -> 'np.ndarray':
+    """
+    将一列字段值转换为一维numpy数组
+
+    不等长或等长的列表值都保存为 object 数组，保证每行对应一个元素
+    """
+    try:
+        column = np.asarray(values)
+    except ValueError:
+        column = None
+    if column is None or column.ndim != 1:
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+    return column
+
+
+def to_pylist(column: Any) -> List[Any]:
+    """
+    将一列转换为python列表，逐行调用标量闭包前使用
+
+    numpy数组（含object数组中的numpy元素）与Arrow列的元素转换为python值，
+    使逐行求值与列表输入看到相同的值（如 np.int64(0) 转为 0）
+    """
+    if hasattr(column, 'to_pylist'):
+        return column.to_pylist()
+    if hasattr(column, 'tolist'):
+        return [v.tolist() if hasattr(v, 'tolist') else v for v in column.tolist()]
+    return list(column)
+
+
+def as_array(values: Iterable[Any]) -> 'np.ndarray':
+    """常量列表编译期转换为numpy数组"""
+    require_numpy()
+    return np.asarray(list(values))
+
+
+def isin(column: 'np.ndarray', values: 'np.ndarray') -> 'np.ndarray':
+    """单值列的 in 判断，列为object(如多值列表)时抛出TypeError由调用方回退逐行求值"""
+    if column.dtype == object:
+        raise TypeError("isin requires a scalar typed column")
+    return np.isin(column, values)
+
+
+def to_epoch(column: 'np.ndarray') -> 'np.ndarray':
+    """时间列转换为int64微秒时间戳"""
+    if column.dtype.kind != 'M':
+        column = column.astype('datetime64[us]')
+    return column.astype('datetime64[us]').astype(np.int64)
+
+
+def epoch(t: datetime) -> int:
+    """时间常量转换为int64微秒时间戳，与 to_epoch 同一基准"""
+    return int(np.datetime64(t, 'us').astype(np.int64))
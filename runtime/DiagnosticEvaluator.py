@@ -1,119 +1,399 @@
+import random
+from collections.abc import Sequence
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple
 from condition import Condition, JoinOp
 from expr.value_handle.factory import HandlerFactory
-from expr.expr import expr
+from expr.compiler import ConditionCompiler
+from expr.cache import CacheInfo, LRUCache
+from .accessor import ObservedEnv
+
+# 诊断函数：入参为 (本次调用对应的条件节点, 记录字段值的环境, 诊断列表)，
+# 返回 True/False，出错时返回 None
+_DiagnoseFunc = Callable[[Condition, ObservedEnv, List], Optional[bool]]
+
+# 诊断计划与求值闭包缓存默认容量
+DEFAULT_PLAN_CACHE_SIZE = 1024
+
+_NOT_OBSERVED = object()
+
+
+def _is_whole(cond: Condition) -> bool:
+    """AND/OR 与单子条件的 NOT 逐叶子诊断，其余连接条件（含 required NOT）整体求值"""
+    if not cond.is_join():
+        return False
+    if cond.join_op in (JoinOp.AND, JoinOp.OR):
+        return False
+    return not (cond.join_op == JoinOp.NOT and not cond.required and len(cond.conditions) == 1)
+
+
+def _combine(join_op: JoinOp, values: List[Optional[bool]]) -> Optional[bool]:
+    """
+    按编译闭包的短路语义合并子结果（None 表示出错）：AND 取第一个不为真的结果，
+    OR 取第一个不为假的结果，NOT 出错仍为出错
+    """
+    if join_op == JoinOp.NOT:
+        value = values[0]
+        return None if value is None else not value
+    stop = True if join_op == JoinOp.OR else False
+    for value in values:
+        if value is stop or value is None:
+            return value
+    return not stop
+
+
+class LazySuggestions(Sequence):
+    """首次读取时才生成的建议列表"""
+
+    __slots__ = ('_generate', '_suggestions')
+
+    def __init__(self, generate: Callable[[], List[str]]):
+        self._generate = generate
+        self._suggestions: Optional[List[str]] = None
+
+    def _get(self) -> List[str]:
+        if self._suggestions is None:
+            self._suggestions = self._generate()
+            self._generate = None
+        return self._suggestions
+
+    def __getitem__(self, index):
+        return self._get()[index]
+
+    def __len__(self) -> int:
+        return len(self._get())
+
+    def __eq__(self, other) -> bool:
+        return self._get() == list(other) if isinstance(other, Sequence) else NotImplemented
+
+    def __repr__(self) -> str:
+        return repr(self._get())
+
+
+class LeafSummary:
+    """
+    单个叶子条件在一批条目上的汇总
+
+    Attributes:
+        condition: 叶子条件（或整体求值的其他连接条件）
+        evaluated: 求值次数
+        passed: 通过次数
+        errors: 出错次数（出错按未通过计）
+        deciding: 该叶子结果单独翻转即可改变整体结果的次数（出错的条目不统计）
+        failing_samples: 未通过时的实际值样本（蓄水池抽样，最多 max_samples 个）
+        last_error: 最近一次出错信息
+    """
+
+    __slots__ = ('condition', 'evaluated', 'passed', 'errors', 'deciding', 'failing_samples', 'last_error',
+                 '_failed', '_max_samples')
+
+    def __init__(self, condition: Condition, max_samples: int):
+        self.condition = condition
+        self.evaluated = 0
+        self.passed = 0
+        self.errors = 0
+        self.deciding = 0
+        self.failing_samples: List[Any] = []
+        self.last_error: Optional[str] = None
+        self._failed = 0
+        self._max_samples = max_samples
+
+    @property
+    def failed(self) -> int:
+        """未通过次数（含出错）"""
+        return self.evaluated - self.passed
+
+    def _sample(self, value: Any) -> None:
+        self._failed += 1
+        if len(self.failing_samples) < self._max_samples:
+            self.failing_samples.append(value)
+        else:
+            index = random.randrange(self._failed)
+            if index < self._max_samples:
+                self.failing_samples[index] = value
+
+    def __repr__(self) -> str:
+        return (f"LeafSummary({self.condition!r}, evaluated={self.evaluated}, passed={self.passed}, "
+                f"errors={self.errors}, deciding={self.deciding})")
+
+
+class BatchDiagnostics:
+    """一批条目的诊断汇总，内存只与叶子数量有关"""
+
+    def __init__(self, leaves: List[LeafSummary]):
+        self.leaves = leaves
+        self.items = 0
+        self.matched = 0
+
+
+class _BatchNode:
+    """批量诊断的求值节点，value 保存当前条目的结果"""
+
+    __slots__ = ('value', 'join_op', 'children', 'evaluate', 'name', 'summary')
+
+    def __init__(self, join_op=None, children=None, evaluate=None, name=None, summary=None):
+        self.value = False
+        self.join_op = join_op
+        self.children: List['_BatchNode'] = children or []
+        self.evaluate = evaluate
+        self.name = name
+        self.summary: Optional[LeafSummary] = summary
+
+    def run(self, env: ObservedEnv) -> Optional[bool]:
+        """求值并统计，出错返回 None"""
+        if self.summary is not None:
+            summary = self.summary
+            summary.evaluated += 1
+            try:
+                value = bool(self.evaluate(env))
+            except Exception as e:
+                summary.errors += 1
+                summary.last_error = str(e)
+                value = None
+            if value:
+                summary.passed += 1
+            elif self.name:
+                summary._sample(env.observed(self.name))
+        else:
+            # 不短路，保证每个叶子都参与统计
+            value = _combine(self.join_op, [child.run(env) for child in self.children])
+        self.value = value
+        return value
+
+    def mark_deciding(self) -> None:
+        """自顶向下标记翻转后会改变整体结果的叶子，结果出错的子树不标记"""
+        if self.value is None:
+            return
+        if self.summary is not None:
+            self.summary.deciding += 1
+            return
+        if self.join_op == JoinOp.NOT:
+            self.children[0].mark_deciding()
+            return
+        # AND 为假（OR 为真）时，只有唯一一个为假（为真）的子条件是决定性的；否则所有子条件都是
+        decisive = not self.value if self.join_op == JoinOp.AND else self.value
+        if decisive:
+            matching = [child for child in self.children if child.value is self.value]
+            if len(matching) == 1:
+                matching[0].mark_deciding()
+            return
+        for child in self.children:
+            child.mark_deciding()
+
 
 class DiagnosticEvaluator:
-    def __init__(self, functions):
+    """
+    诊断评估器
+
+    条件按结构编译一次为带记录的闭包树，评估时单次遍历：每个叶子条件执行编译后的闭包，
+    同时从求值环境中取出该叶子读取到的字段值作为实际值，方法字段只调用一次
+
+    Args:
+        functions: 自定义函数
+        sample_rate: 采样比例，未被采样的评估只求值不生成诊断，诊断列表为空
+        failures_only: 只记录未通过（含出错）的叶子条件
+        lazy_suggestions: 建议在首次读取 diagnostic["suggestions"] 时才生成
+        cache_size: 诊断计划与求值闭包的缓存容量（LRU，按条件结构指纹），为 0 时不缓存
+
+    返回的评估结果始终来自编译后的求值闭包，与 Executor 一致，不受采样影响
+    """
+
+    def __init__(self, functions, sample_rate: float = 1.0, failures_only: bool = False,
+                 lazy_suggestions: bool = False, cache_size: int = DEFAULT_PLAN_CACHE_SIZE):
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError(f"sample_rate must be in [0, 1], got {sample_rate}")
         self.functions = functions
         self.handler_factory = HandlerFactory()
+        self.sample_rate = sample_rate
+        self.failures_only = failures_only
+        self.lazy_suggestions = lazy_suggestions
+        self._compiler = ConditionCompiler(functions)
+        # 按结构指纹缓存：('plan', fp) -> (诊断闭包, 方法字段名)，('compiled', fp) -> 求值闭包
+        self._cache = LRUCache(cache_size)
+
+    def cache_info(self) -> CacheInfo:
+        """诊断计划缓存命中统计"""
+        return self._cache.info()
+
+    def cache_clear(self) -> None:
+        """清空诊断计划缓存及统计"""
+        self._cache.clear()
 
     def evaluate_with_diagnostics(self, cond: Condition, env: dict):
         """带诊断信息的评估"""
-        # 如果是连接条件（AND）
-        if cond.join_op == JoinOp.AND:
-            diagnostics = []
-            all_passed = True
-
-            for sub_cond in cond.conditions:
-                result, sub_diagnostics = self.evaluate_with_diagnostics(sub_cond, env)
-                diagnostics.extend(sub_diagnostics)
+        evaluate = self._compile(cond)
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            # 未被采样：只求值
+            try:
+                return bool(evaluate(env)), []
+            except Exception:
+                return False, []
 
-                if not result:
-                    all_passed = False
+        diagnose, methods = self._plan(cond)
+        observed = ObservedEnv(env, methods)
+        try:
+            result = bool(evaluate(observed))
+        except Exception:
+            result = False
+        diagnostics = []
+        diagnose(cond, observed, diagnostics)
+        return result, diagnostics
 
-            return all_passed, diagnostics
+    def diagnose_batch(self, cond: Condition, envs: Iterable[Mapping[str, Any]],
+                       max_samples: int = 5) -> BatchDiagnostics:
+        """
+        批量诊断，返回每个叶子条件的汇总而不是逐条目的诊断
 
-        # 如果是其他连接条件（OR/NOT等）
-        elif cond.is_join():
-            return self._evaluate_non_and_condition(cond, env)
+        每个条目单次遍历所有叶子，只累加计数并抽样未通过的实际值，内存为 O(叶子数)；
+        matched 由编译后的整体求值闭包计算，与 Executor 一致
+        """
+        leaves: List[LeafSummary] = []
+        root = self._build_batch(cond, leaves, max_samples)
+        methods = frozenset(f[:-2] for f in cond.all_fields() if f.endswith("()"))
+        evaluate = self._compile(cond)
 
-        # 如果是叶子条件（基础条件）
-        else:
-            # 这里应该添加原来的叶子条件评估逻辑
-            expr_str = expr(cond)
+        result = BatchDiagnostics(leaves)
+        for env in envs:
+            result.items += 1
+            observed = ObservedEnv(env, methods)
             try:
-                result = eval(expr_str, {"__builtins__": {}, **self.functions}, env)
-
-                # 获取字段实际值
-                if cond.field:
-                    if cond.field.endswith("()"):
-                        # 提取不带括号的方法名，并尝试调用该方法
-                        method_name = cond.field[:-2]
-                        if method_name in env and callable(env[method_name]):
-                            try:
-                                actual_value = env[method_name]()
-                            except Exception as e:
-                                actual_value = f"Error calling {method_name}: {str(e)}"
-                        else:
-                            actual_value = f"Method '{method_name}' not found or not callable"
-                    else:
-                        # 直接从环境变量中获取字段值
-                        actual_value = env.get(cond.field)
-                else:
-                    actual_value = None
+                matched = bool(evaluate(observed))
+            except Exception:
+                matched = False
+            if matched:
+                result.matched += 1
+            # 叶子树与整体结果一致时才归因（简化可能改变子条件顺序）
+            if root.run(observed) is matched:
+                root.mark_deciding()
+        return result
 
+    def _build_batch(self, cond: Condition, leaves: List[LeafSummary], max_samples: int) -> _BatchNode:
+        if cond.is_join() and not _is_whole(cond):
+            return _BatchNode(join_op=cond.join_op,
+                              children=[self._build_batch(sub_cond, leaves, max_samples)
+                                        for sub_cond in cond.conditions])
 
-                # 生成建议
-                suggestions = []
-                if not result:
-                    suggestions = self.handler_factory.get_suggestions(cond, actual_value)
+        summary = LeafSummary(cond, max_samples)
+        leaves.append(summary)
+        field = None if cond.is_join() else cond.field
+        name = field[:-2] if field and field.endswith("()") else field
+        return _BatchNode(evaluate=self._compile(cond), name=name, summary=summary)
 
-                diagnostic = {
-                    "condition": cond,
-                    "passed": result,
-                    "actual_value": actual_value,
-                    "suggestions": suggestions
-                }
+    def _compile(self, cond: Condition) -> Callable:
+        return self._cache.get_or_build(('compiled', cond.fingerprint()), lambda: self._compiler.compile(cond))
 
-                return result, [diagnostic]
+    def _plan(self, cond: Condition) -> Tuple[_DiagnoseFunc, frozenset]:
+        def build():
+            methods = frozenset(f[:-2] for f in cond.all_fields() if f.endswith("()"))
+            return self._build(cond), methods
 
-            except Exception as e:
-                diagnostic = {
-                    "condition": cond,
-                    "passed": False,
-                    "error": str(e),
-                    "suggestions": [f"条件评估出错: {e}"]
-                }
-                return False, [diagnostic]
-
-
-    def _evaluate_non_and_condition(self, cond: Condition, env: dict):
-        """评估非AND条件"""
-        if cond.join_op == JoinOp.OR:
-            # 递归评估OR条件中的每个子条件
-            diagnostics = []
-            any_passed = False
-
-            for sub_cond in cond.conditions:
-                result, sub_diagnostics = self.evaluate_with_diagnostics(sub_cond, env)
-                diagnostics.extend(sub_diagnostics)
-                if result:
-                    any_passed = True
-
-            return any_passed, diagnostics
-
-        elif cond.join_op == JoinOp.NOT:
-            # 评估NOT条件中的子条件并反转结果
-            if len(cond.conditions) == 1:
-                result, diagnostics = self.evaluate_with_diagnostics(cond.conditions[0], env)
-                return not result, diagnostics
-            else:
-                # 简单处理NOT条件（保持原有逻辑）
-                expr_str = expr(cond)
+        return self._cache.get_or_build(('plan', cond.fingerprint()), build)
+
+    def _build(self, cond: Condition) -> _DiagnoseFunc:
+        """
+        递归构建诊断闭包，AND/OR 不短路以便给出所有叶子条件的诊断
+
+        闭包只依赖条件结构，诊断中引用的条件节点由调用时传入，结构相同的条件共享闭包
+        """
+        if cond.is_join() and not _is_whole(cond):
+            children = [self._build(sub_cond) for sub_cond in cond.conditions]
+            join_op = cond.join_op
+
+            def diagnose_join(node: Condition, env: ObservedEnv, diagnostics: List) -> Optional[bool]:
+                return _combine(join_op, [child(sub_node, env, diagnostics)
+                                          for child, sub_node in zip(children, node.conditions)])
+
+            return diagnose_join
+
+        if cond.is_join() and cond.join_op == JoinOp.NOT and len(cond.conditions) == 1:
+            # required NOT 还要求字段非零，结果整体求值，子条件只用于给出诊断
+            child = self._build(cond.conditions[0])
+            evaluate = self._compile(cond)
+
+            def diagnose_required(node: Condition, env: ObservedEnv, diagnostics: List) -> Optional[bool]:
+                child(node.conditions[0], env, diagnostics)
+                try:
+                    return bool(evaluate(env))
+                except Exception:
+                    return None
+
+            return diagnose_required
+
+        if cond.is_join():
+            # 其他连接条件整体求值，不给出叶子诊断
+            evaluate = self._compile(cond)
+
+            def diagnose_other(node: Condition, env: ObservedEnv, diagnostics: List) -> Optional[bool]:
                 try:
-                    result = eval(expr_str, {"__builtins__": {}, **self.functions}, env)
-                    return result, []
+                    return bool(evaluate(env))
                 except Exception as e:
-                    return False, [f"评估出错: {e}"]
+                    diagnostics.append(f"评估出错: {e}")
+                    return None
 
+            return diagnose_other
+
+        return self._build_leaf(cond)
+
+    def _build_leaf(self, cond: Condition) -> _DiagnoseFunc:
+        """叶子条件：求值并记录结果与实际值"""
+        evaluate = self._compile(cond)
+        field = cond.field
+        name = field[:-2] if field and field.endswith("()") else field
+        # 建议生成的处理器在构建时确定
+        handler = self.handler_factory.get_handler(cond.val_type)
+        if handler is not None:
+            suggest = handler.generate_suggestions
         else:
-            # 其他非AND条件保持原有逻辑
-            expr_str = expr(cond)
+            suggest = lambda condition, actual_value: ["未知类型，无法提供具体建议"]
+        failures_only = self.failures_only
+        lazy = self.lazy_suggestions
+
+        def diagnose_leaf(node: Condition, env: ObservedEnv, diagnostics: List) -> Optional[bool]:
             try:
-                result = eval(expr_str, {"__builtins__": {}, **self.functions}, env)
-                return result, []
+                result = evaluate(env)
             except Exception as e:
-                return False, [f"评估出错: {e}"]
+                diagnostics.append({
+                    "condition": node,
+                    "passed": False,
+                    "error": str(e),
+                    "suggestions": [f"条件评估出错: {e}"]
+                })
+                return None
+
+            if result and failures_only:
+                return result
+
+            actual_value = self._actual_value(env, name) if name else None
+
+            # 生成建议
+            suggestions = []
+            if not result:
+                if lazy:
+                    suggestions = LazySuggestions(lambda: suggest(node, actual_value))
+                else:
+                    suggestions = suggest(node, actual_value)
+
+            diagnostics.append({
+                "condition": node,
+                "passed": result,
+                "actual_value": actual_value,
+                "suggestions": suggestions
+            })
+            return result
+
+        return diagnose_leaf
+
+    @staticmethod
+    def _actual_value(env: ObservedEnv, name: str) -> Any:
+        """字段实际值，优先取求值时已读取的值"""
+        value = env.observed(name, _NOT_OBSERVED)
+        if value is not _NOT_OBSERVED:
+            return value
+        # 叶子条件未读取该字段（如恒真条件），按需读取
+        try:
+            return env[name]
+        except Exception as e:
+            return f"Error reading {name}: {e}"
+
 
 def print_diagnostics(diagnostics):
     """打印诊断结果"""
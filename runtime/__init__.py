@@ -2,5 +2,7 @@ from .executor import Executor, ExecutedResult, ExecutedItem
 from .loader import Loader
 from .evaluator import Evaluator
 from .DiagnosticEvaluator import DiagnosticEvaluator
+from .accessor import AccessorPlan
+from .rule_index import RuleIndex
 
-__all__ = ['Executor', 'ExecutedResult', 'ExecutedItem', 'Loader', 'Evaluator', 'DiagnosticEvaluator']
+__all__ = ['Executor', 'ExecutedResult', 'ExecutedItem', 'Loader', 'Evaluator', 'DiagnosticEvaluator', 'AccessorPlan', 'RuleIndex']
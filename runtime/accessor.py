@@ -0,0 +1,153 @@
+from typing import Any, Dict, List, Mapping, Tuple
+from condition.condition import Condition
+from condition.op import Op
+from condition.values import unquote, val_to_string_slice
+from condition.var import ValType
+
+
+def referenced_fields(c: Condition) -> List[str]:
+    """获取条件求值需要读取的字段，包含 VAR 类型值引用的字段"""
+    fields = set(c.all_fields())
+    stack = [c]
+    while stack:
+        node = stack.pop()
+        if node.is_join():
+            stack.extend(node.conditions)
+            continue
+        if node.is_always_true() or node.is_always_false():
+            fields.discard(node.field)
+        elif node.val_type == ValType.VAR and node.val:
+            if node.op in [Op.IN, Op.NOT_IN, Op.CONTAINS_ANY, Op.NOT_CONTAINS_ANY]:
+                fields.update(val_to_string_slice(node.val))
+            else:
+                fields.add(unquote(node.val))
+    return sorted(fields)
+
+
+class AccessorPlan:
+    """
+    字段访问计划
+
+    规则编译时根据条件引用的字段生成一次，求值时只读取这些属性，
+    Field() 形式的方法每个条目最多调用一次，不会触发 SetXxx 等无关方法
+    """
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        # (属性名, 是否方法调用)
+        self._accessors: List[Tuple[str, bool]] = []
+        seen = set()
+        for field in fields:
+            is_method = field.endswith("()")
+            name = field[:-2] if is_method else field
+            if name in seen:
+                continue
+            seen.add(name)
+            self._accessors.append((name, is_method))
+
+    @property
+    def names(self) -> List[str]:
+        """求值环境中的字段名（方法字段去掉 ()）"""
+        return [name for name, _ in self._accessors]
+
+    @classmethod
+    def from_condition(cls, c: Condition) -> 'AccessorPlan':
+        """根据条件生成访问计划"""
+        return cls(referenced_fields(c))
+
+    def resolve(self, item: Any) -> Mapping[str, Any]:
+        """读取条目引用到的字段，生成求值环境"""
+        if isinstance(item, Mapping):
+            return item
+
+        env: Dict[str, Any] = {}
+        for name, is_method in self._accessors:
+            value = getattr(item, name)
+            if is_method and callable(value):
+                value = value()
+            env[name] = value
+        return env
+
+    def resolve_columns(self, items: List[Any]) -> Dict[str, List[Any]]:
+        """按列读取一批条目引用到的字段，返回 字段名 -> 值列表"""
+        columns: Dict[str, List[Any]] = {}
+        for name, is_method in self._accessors:
+            values = []
+            for item in items:
+                value = item[name] if isinstance(item, Mapping) else getattr(item, name)
+                if is_method and callable(value):
+                    value = value()
+                values.append(value)
+            columns[name] = values
+        return columns
+
+
+class LazyEnv(Mapping):
+    """
+    惰性求值环境
+
+    按需读取条目属性并缓存，方法属性在首次访问时调用一次；
+    适合字段集合很大但单次只会访问少量字段的场景（如规则索引）
+    """
+
+    def __init__(self, item: Any):
+        self._item = item
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        try:
+            value = getattr(self._item, name)
+        except AttributeError:
+            raise KeyError(name)
+        if callable(value):
+            value = value()
+        self._values[name] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class ObservedEnv(Mapping):
+    """
+    记录字段值的求值环境
+
+    包装字段环境，首次读取时缓存字段值，methods 中的方法字段只调用一次；
+    诊断时叶子条件求值读到的值即为实际值，无需再次读取或调用方法
+    """
+
+    def __init__(self, env: Mapping[str, Any], methods: frozenset = frozenset()):
+        self._env = env
+        self._methods = methods
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        value = self._env[name]
+        if name in self._methods and callable(value):
+            value = value()
+        self._values[name] = value
+        return value
+
+    def observed(self, name: str, default: Any = None) -> Any:
+        """已读取的字段值，未读取时返回default"""
+        return self._values.get(name, default)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._values or name in self._env
+
+    def __iter__(self):
+        return iter(self._env)
+
+    def __len__(self) -> int:
+        return len(self._env)
@@ -0,0 +1,56 @@
+from typing import Any, Dict, List, Mapping, Sequence
+from expr.value_handle.vector import to_pylist
+
+
+def is_columnar(items: Any) -> bool:
+    """判断输入是否为列式批次：字段名 -> 数组 的映射，或 Arrow RecordBatch/Table"""
+    return isinstance(items, Mapping) or _is_arrow(items)
+
+
+def _is_arrow(items: Any) -> bool:
+    # 鸭子类型判断，不强依赖 pyarrow
+    return hasattr(items, 'num_rows') and hasattr(items, 'schema') and hasattr(items, 'column')
+
+
+class ColumnarBatch:
+    """列式批次适配，统一 dict of arrays 与 Arrow RecordBatch 的读取方式"""
+
+    def __init__(self, data: Any):
+        self._data = data
+        if _is_arrow(data):
+            self.num_rows = data.num_rows
+            self._names = set(data.schema.names)
+        else:
+            self._names = set(data.keys())
+            self.num_rows = len(next(iter(data.values()))) if data else 0
+            for name, column in data.items():
+                if len(column) != self.num_rows:
+                    raise ValueError(f"columnar batch column {name} has {len(column)} rows, expected {self.num_rows}")
+
+    def column(self, name: str) -> Sequence[Any]:
+        """读取一列，Arrow列转换为numpy数组或python列表"""
+        if name not in self._names:
+            raise KeyError(f"columnar batch has no column {name}")
+        column = self._data.column(name) if _is_arrow(self._data) else self._data[name]
+        if hasattr(column, 'to_numpy'):
+            try:
+                return column.to_numpy(zero_copy_only=False)
+            except TypeError:
+                return column.to_numpy()
+        if hasattr(column, 'to_pylist'):
+            return column.to_pylist()
+        return column
+
+    def columns(self, names: List[str]) -> Dict[str, Sequence[Any]]:
+        """读取多列"""
+        return {name: self.column(name) for name in names}
+
+    def pylists(self, names: List[str]) -> Dict[str, List[Any]]:
+        """读取多列为python列表，供逐行求值使用，与列表输入看到相同的python值"""
+        result = {}
+        for name in names:
+            if name not in self._names:
+                raise KeyError(f"columnar batch has no column {name}")
+            column = self._data.column(name) if _is_arrow(self._data) else self._data[name]
+            result[name] = to_pylist(column)
+        return result
@@ -1,4 +1,4 @@
-from typing import Callable, Any
+from typing import Callable, Any, Dict, Optional
 from condition.condition import Condition
 
 
@@ -7,5 +7,11 @@ class Evaluator:
         self.condition = condition
         self.evaluate_func = evaluate_func
 
+    @classmethod
+    def compile(cls, condition: Condition, functions: Optional[Dict[str, Callable]] = None) -> 'Evaluator':
+        """基于编译后的闭包创建评估器，env 为字段环境"""
+        from expr.compiler import compile_condition
+        return cls(condition, compile_condition(condition, functions))
+
     def evaluate(self, env: Any) -> bool:
         return self.evaluate_func(env)
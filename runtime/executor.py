@@ -1,9 +1,18 @@
-from typing import List, Any, Dict, Optional, Callable
+from typing import List, Any, AsyncIterable, AsyncIterator, Dict, Iterable, Mapping, Optional, Callable, Tuple, Union
 from condition.condition import Condition, JoinOp, Op
-from .loader import Loader
+from .loader import Loader, loader_dependencies, select_loaders
 from .evaluator import Evaluator
+from .accessor import AccessorPlan, LazyEnv
+from .partial import PartialEvaluateFunc, compile_partial
+from .columnar import ColumnarBatch, is_columnar
+from .sharded import ShardedEvaluator
+from expr.clock import Clock
+from expr.compiler import ConditionCompiler
 import asyncio
 
+# stream() 默认的微批大小
+DEFAULT_STREAM_BATCH_SIZE = 1024
+
 
 class ExecutedItem:
     def __init__(self, item: Any, reason: Optional[str] = None):
@@ -16,64 +25,276 @@ class ExecutedResult:
         self.matched_items: List[ExecutedItem] = []
         self.not_matched_items: List[ExecutedItem] = []
         self.unloaded_items: List[ExecutedItem] = []
+        # 列式批次输入时，命中的行号
+        self.matched_indices: List[int] = []
 
 
 class Executor:
-    def __init__(self, condition: Condition, loaders: List[Loader], env_type: type):
+    def __init__(self, condition: Condition, loaders: List[Loader], env_type: type,
+                 functions: Optional[Dict[str, Callable]] = None,
+                 vectorized: bool = False,
+                 clock: Optional[Clock] = None,
+                 processes: Optional[int] = None,
+                 chunk_size: int = 1024,
+                 prune: bool = False):
         self.condition = condition
         self.loaders = loaders
         self.env_type = env_type
+        # 每次评估一批条目时对时钟做快照，批内相对时间边界只计算一次
+        self.clock = clock or (functions or {}).get("Clock") or Clock()
+        self.functions = dict(functions or {}, Clock=self.clock)
+        self.vectorized = vectorized
+        self._accessor_plan = AccessorPlan.from_condition(condition)
+        # 构造时去掉不提供条件所需字段的加载器，并构建依赖图（校验无环）
+        self.active_loaders = select_loaders(loaders, self._accessor_plan.names)
+        self._loader_deps = loader_dependencies(self.active_loaders)
+        # 剪枝模式：按成本依次执行加载器，每个加载器前用已就绪字段部分求值，淘汰确定不满足的条目
+        self.prune = prune
+        self._prune_steps = self._build_prune_steps() if prune else None
         self.evaluator = self._create_evaluator()
+        self.batch_evaluator = self._create_batch_evaluator() if vectorized else None
+        # 指定进程数时按分片在进程池中评估，条目数不足一个分片时仍在当前进程评估
+        self.sharded_evaluator = ShardedEvaluator(condition, self.functions, processes, chunk_size) \
+            if processes else None
+
+    def _build_prune_steps(self) -> List[Tuple[int, Optional[PartialEvaluateFunc]]]:
+        """
+        生成剪枝模式的执行步骤：(加载器下标, 执行前的部分求值函数)
+
+        在满足依赖的前提下每次选成本最低的加载器；尚未执行的加载器提供的字段视为未知，
+        仍有未声明 provides 的加载器未执行时不剪枝
+        """
+        loaders = self.active_loaders
+        order: List[int] = []
+        done = set()
+        while len(order) < len(loaders):
+            ready = [i for i in range(len(loaders))
+                     if i not in done and all(j in done for j in self._loader_deps[i])]
+            i = min(ready, key=lambda k: (loaders[k].cost, k))
+            order.append(i)
+            done.add(i)
+
+        compiler = ConditionCompiler(self.functions)
+        referenced = set(self._accessor_plan.names)
+        steps: List[Tuple[int, Optional[PartialEvaluateFunc]]] = []
+        previous_known = None
+        for k, i in enumerate(order):
+            pending = [loaders[j] for j in order[k:]]
+            partial = None
+            if all(loader.provides for loader in pending):
+                known = referenced.difference(*[loader.provides for loader in pending])
+                # 已就绪字段没有变化时上一步已经剪过
+                if known and known != previous_known:
+                    partial = compile_partial(self.condition, known, compiler)
+                previous_known = known
+            steps.append((i, partial))
+        return steps
+
+    def close(self) -> None:
+        """释放进程池等资源"""
+        if self.sharded_evaluator is not None:
+            self.sharded_evaluator.close()
 
     def _create_evaluator(self) -> Callable:
-        from expr.expr import expr
-        expr_str = expr(self.condition)
-        return lambda env: eval(expr_str, {"__builtins__": {}}, self._get_env_vars(env))
+        from expr.compiler import compile_condition
+        self._evaluate_env = compile_condition(self.condition, self.functions)
+        evaluate = self._evaluate_env
+        resolve = self._accessor_plan.resolve
+        return lambda env: evaluate(resolve(env))
+
+    def _create_batch_evaluator(self) -> Callable:
+        from expr.batch_compiler import compile_condition_batch
+        return compile_condition_batch(self.condition, self.functions)
 
     def _get_env_vars(self, env: Any) -> Dict:
-        """获取环境变量"""
-        vars_dict = {}
-        if hasattr(env, '__dict__'):
-            vars_dict.update(env.__dict__)
-        # 添加方法调用支持
-        for attr_name in dir(env):
-            if callable(getattr(env, attr_name)) and not attr_name.startswith('_'):
-                vars_dict[attr_name] = getattr(env, attr_name)()
-        return vars_dict
-
-    async def execute(self, items: List[Any]) -> ExecutedResult:
+        """获取环境变量，仅读取条件引用的字段"""
+        return self._accessor_plan.resolve(env)
+
+    async def execute(self, items: Any) -> ExecutedResult:
+        """
+        执行条件
+
+        items 为条目列表，或列式批次（字段名 -> 数组 的映射、Arrow RecordBatch）；
+        列式批次的字段已就绪，不经过加载器，结果只填充 matched_indices，求值出错的行不计入
+        """
+        if is_columnar(items):
+            return self._execute_columnar(ColumnarBatch(items))
+
         result = ExecutedResult()
 
-        if not self.loaders:
+        if not self.active_loaders:
             # 无加载器直接评估
-            for item in items:
-                try:
-                    matched = self.evaluator(item)
-                    if matched:
-                        result.matched_items.append(ExecutedItem(item))
-                    else:
-                        result.not_matched_items.append(ExecutedItem(item))
-                except Exception as e:
-                    result.not_matched_items.append(ExecutedItem(item, str(e)))
+            await self._evaluate(items, result)
             return result
 
-        filtered_items = items[:]
+        if self._prune_steps is not None:
+            filtered_items = await self._run_loaders_pruned(items, result)
+        else:
+            filtered_items = await self._run_loaders(items, result)
 
-        # 按加载器顺序处理
-        for loader in self.loaders:
-            if filtered_items:
-                # 加载数据
-                unloaded_items = await loader.load(self.condition, filtered_items)
+        # 最终评估
+        await self._evaluate(filtered_items, result)
 
-                # 处理未加载项
-                unloaded_item_set = set(unloaded_items)
-                result.unloaded_items.extend([ExecutedItem(item) for item in unloaded_items])
+        return result
 
-                # 过滤已加载项
-                filtered_items = [item for item in filtered_items if item not in unloaded_item_set]
+    async def stream(self, source: Union[AsyncIterable[Any], Iterable[Any]],
+                     batch_size: int = DEFAULT_STREAM_BATCH_SIZE) -> AsyncIterator[ExecutedItem]:
+        """
+        流式执行条件，逐个产出符合条件的条目
 
-        # 最终评估
-        for item in filtered_items:
+        source 为异步或同步可迭代对象（如数据库游标），按 batch_size 攒成微批后经过加载器和评估；
+        消费方取走当前批的结果前不会读取下一批，内存占用与批大小相关，与总条目数无关
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+        batch: List[Any] = []
+        if isinstance(source, AsyncIterable):
+            async for item in source:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    for executed in await self._execute_batch(batch):
+                        yield executed
+                    batch = []
+        else:
+            for item in source:
+                batch.append(item)
+                if len(batch) >= batch_size:
+                    for executed in await self._execute_batch(batch):
+                        yield executed
+                    batch = []
+        if batch:
+            for executed in await self._execute_batch(batch):
+                yield executed
+
+    async def _execute_batch(self, batch: List[Any]) -> List[ExecutedItem]:
+        """执行一个微批，只保留符合条件的条目"""
+        result = await self.execute(batch)
+        return result.matched_items
+
+    async def _run_loaders(self, items: List[Any], result: ExecutedResult) -> List[Any]:
+        """
+        按依赖图运行加载器，返回全部加载成功的条目
+
+        每个加载器等待其依赖完成后，只加载依赖均加载成功的条目；互不依赖的加载器并发执行，
+        同时就绪时按成本从低到高启动
+        """
+        loaders = self.active_loaders
+        failed: List[Optional[set]] = [None] * len(loaders)
+        unloaded: List[List[Any]] = [[] for _ in loaders]
+        tasks: List[Optional[asyncio.Future]] = [None] * len(loaders)
+
+        async def run(i: int) -> None:
+            if self._loader_deps[i]:
+                await asyncio.gather(*[tasks[j] for j in self._loader_deps[i]])
+            # 依赖（含间接依赖）加载失败的条目不再加载
+            upstream = set().union(*[failed[j] for j in self._loader_deps[i]])
+            pending = [item for item in items if id(item) not in upstream]
+            own = await loaders[i].load(self.condition, pending) if pending else []
+            unloaded[i] = own
+            failed[i] = upstream | {id(item) for item in own}
+
+        for i in sorted(range(len(loaders)), key=lambda k: (loaders[k].cost, k)):
+            tasks[i] = asyncio.ensure_future(run(i))
+        await asyncio.gather(*tasks)
+
+        # 按加载器顺序记录未加载项，同一条目只记录一次
+        reported = set()
+        for own in unloaded:
+            for item in own:
+                if id(item) not in reported:
+                    reported.add(id(item))
+                    result.unloaded_items.append(ExecutedItem(item))
+        return [item for item in items if id(item) not in reported]
+
+    async def _run_loaders_pruned(self, items: List[Any], result: ExecutedResult) -> List[Any]:
+        """按成本顺序运行加载器，每个加载器前淘汰已确定不满足条件的条目"""
+        pending = list(items)
+        for i, partial in self._prune_steps:
+            if partial is not None:
+                pending = self._prune_items(pending, partial, result)
+            if not pending:
+                break
+            unloaded_items = await self.active_loaders[i].load(self.condition, pending)
+            if unloaded_items:
+                unloaded_ids = {id(item) for item in unloaded_items}
+                result.unloaded_items.extend(ExecutedItem(item) for item in unloaded_items)
+                pending = [item for item in pending if id(item) not in unloaded_ids]
+        return pending
+
+    def _prune_items(self, items: List[Any], partial: PartialEvaluateFunc, result: ExecutedResult) -> List[Any]:
+        """部分求值为假的条目直接记为不符，其余（真或未知）继续加载"""
+        kept = []
+        with self.clock.snapshot():
+            for item in items:
+                env = item if isinstance(item, Mapping) else LazyEnv(item)
+                if partial(env) is False:
+                    result.not_matched_items.append(ExecutedItem(item))
+                else:
+                    kept.append(item)
+        return kept
+
+    async def _evaluate(self, items: List[Any], result: ExecutedResult) -> None:
+        sharded = self.sharded_evaluator
+        if sharded is not None and len(items) > sharded.chunk_size:
+            await self._evaluate_sharded(items, result)
+        else:
+            self._evaluate_items(items, result)
+
+    async def _evaluate_sharded(self, items: List[Any], result: ExecutedResult) -> None:
+        """
+        多进程分片评估
+
+        字段在当前进程读取（方法字段在此调用），只把引用到的字段值发送给子进程
+        """
+        names = self._accessor_plan.names
+        rows: List[tuple] = []
+        positions: List[int] = []
+        reasons: Dict[int, str] = {}
+        for i, item in enumerate(items):
+            try:
+                env = self._accessor_plan.resolve(item)
+                rows.append(tuple(env[name] for name in names))
+                positions.append(i)
+            except Exception as e:
+                reasons[i] = str(e)
+
+        matched, errors = await self.sharded_evaluator.evaluate(names, rows, self.clock.now())
+        outcomes: Dict[int, Tuple[bool, Optional[str]]] = {}
+        for row, i in enumerate(positions):
+            outcomes[i] = (matched[row], errors.get(row))
+
+        for i, item in enumerate(items):
+            if i in reasons:
+                result.not_matched_items.append(ExecutedItem(item, reasons[i]))
+                continue
+            is_matched, reason = outcomes[i]
+            if is_matched:
+                result.matched_items.append(ExecutedItem(item))
+            else:
+                result.not_matched_items.append(ExecutedItem(item, reason))
+
+    def _evaluate_items(self, items: List[Any], result: ExecutedResult) -> None:
+        """评估条目并写入结果，同一批条目使用同一时钟快照"""
+        with self.clock.snapshot():
+            self._evaluate_snapshot(items, result)
+
+    def _evaluate_snapshot(self, items: List[Any], result: ExecutedResult) -> None:
+        if self.batch_evaluator is not None and items:
+            try:
+                mask = self._evaluate_batch(items)
+            except Exception:
+                # 向量化失败（如字段缺失、空值参与比较），回退逐条评估以保留每条的原因
+                mask = None
+            if mask is not None:
+                for item, matched in zip(items, mask):
+                    if matched:
+                        result.matched_items.append(ExecutedItem(item))
+                    else:
+                        result.not_matched_items.append(ExecutedItem(item))
+                return
+
+        for item in items:
             try:
                 matched = self.evaluator(item)
                 if matched:
@@ -83,4 +304,40 @@ class Executor:
             except Exception as e:
                 result.not_matched_items.append(ExecutedItem(item, str(e)))
 
+    def _execute_columnar(self, batch: ColumnarBatch) -> ExecutedResult:
+        """评估列式批次，返回命中的行号；求值出错的行不计入 matched_indices"""
+        with self.clock.snapshot():
+            return self._execute_columnar_snapshot(batch)
+
+    def _execute_columnar_snapshot(self, batch: ColumnarBatch) -> ExecutedResult:
+        result = ExecutedResult()
+        size = batch.num_rows
+
+        if self.batch_evaluator is not None:
+            from expr.value_handle.vector import np, to_column
+            try:
+                vectors = {name: column if isinstance(column, np.ndarray) else to_column(list(column))
+                           for name, column in batch.columns(self._accessor_plan.names).items()}
+                result.matched_indices = np.flatnonzero(self.batch_evaluator(vectors, size)).tolist()
+                return result
+            except Exception:
+                # 向量化失败（如列中有空值），回退逐行评估，出错的行不计入结果
+                pass
+
+        # 逐行评估使用python值，numpy/Arrow 列与列表输入结果一致
+        evaluate = self._evaluate_env
+        columns = batch.pylists(self._accessor_plan.names)
+        names = list(columns)
+        for i in range(size):
+            try:
+                if evaluate({name: columns[name][i] for name in names}):
+                    result.matched_indices.append(i)
+            except Exception:
+                continue
         return result
+
+    def _evaluate_batch(self, items: List[Any]) -> List[bool]:
+        """向量化评估一批条目，返回布尔掩码"""
+        from expr.value_handle.vector import to_column
+        columns = {name: to_column(values) for name, values in self._accessor_plan.resolve_columns(items).items()}
+        return self.batch_evaluator(columns, len(items)).tolist()
@@ -0,0 +1,56 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Generic, List, Tuple, TypeVar
+from condition.op import Op
+
+T = TypeVar('T')
+
+# 边界排序键的第二项：同一阈值下，较容易满足的边界排在前（下界）或后（上界），
+# 查询键取 0.5 使等值时严格/非严格边界自然区分
+_LOWER_FLAGS = {Op.GTE: 0, Op.GT: 1}
+_UPPER_FLAGS = {Op.LT: 0, Op.LTE: 1}
+_QUERY_FLAG = 0.5
+
+# 可建立区间索引的操作符
+RangeOps = [Op.GT, Op.GTE, Op.LT, Op.LTE]
+
+
+class IntervalIndex(Generic[T]):
+    """
+    单字段的有序边界索引
+
+    下界（GT/GTE）与上界（LT/LTE）分别按阈值排序保存，给定字段值时，
+    满足的下界是有序列表的前缀，满足的上界是后缀，二分定位后直接切片，
+    查询复杂度 O(log n + k)
+    """
+
+    def __init__(self):
+        self._lower_keys: List[Tuple[Any, int]] = []
+        self._lower_entries: List[T] = []
+        self._upper_keys: List[Tuple[Any, int]] = []
+        self._upper_entries: List[T] = []
+
+    def __len__(self) -> int:
+        return len(self._lower_entries) + len(self._upper_entries)
+
+    def add(self, op: Op, threshold: Any, entry: T) -> None:
+        """添加 字段 op 阈值 的边界"""
+        if op in _LOWER_FLAGS:
+            keys, entries, key = self._lower_keys, self._lower_entries, (threshold, _LOWER_FLAGS[op])
+        elif op in _UPPER_FLAGS:
+            keys, entries, key = self._upper_keys, self._upper_entries, (threshold, _UPPER_FLAGS[op])
+        else:
+            raise ValueError(f"interval index unsupported op {op}")
+
+        pos = bisect_right(keys, key)
+        keys.insert(pos, key)
+        entries.insert(pos, entry)
+
+    def query(self, value: Any) -> List[T]:
+        """返回字段值满足的边界对应的条目，值与阈值不可比较时抛出TypeError"""
+        key = (value, _QUERY_FLAG)
+        result: List[T] = []
+        if self._lower_keys:
+            result.extend(self._lower_entries[:bisect_left(self._lower_keys, key)])
+        if self._upper_keys:
+            result.extend(self._upper_entries[bisect_right(self._upper_keys, key):])
+        return result
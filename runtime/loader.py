@@ -1,12 +1,33 @@
-from typing import List, Any
+from typing import List, Any, Optional, Sequence
 from condition.condition import Condition
 import asyncio
 
 
+def _field_name(field: str) -> str:
+    """字段名统一为环境中的名称，方法字段去掉 ()"""
+    return field[:-2] if field.endswith("()") else field
+
+
 class Loader:
-    def __init__(self, name: str, cost: int = 0):
+    """
+    加载器
+
+    provides 为加载器填充的字段，requires 为加载前需要已就绪的字段（字段名可带 ()）；
+    两者都未声明的加载器按列表顺序与前后加载器串行执行
+    """
+
+    def __init__(self, name: str, cost: int = 0,
+                 provides: Optional[Sequence[str]] = None,
+                 requires: Optional[Sequence[str]] = None):
         self.name = name
         self.cost = cost
+        self.provides = frozenset(_field_name(f) for f in provides or ())
+        self.requires = frozenset(_field_name(f) for f in requires or ())
+
+    @property
+    def declared(self) -> bool:
+        """是否声明了字段依赖"""
+        return bool(self.provides or self.requires)
 
     async def load(self, condition: Condition, items: List[Any]) -> List[Any]:
         """
@@ -14,3 +35,70 @@ class Loader:
         返回未加载的项列表
         """
         return []
+
+
+def select_loaders(loaders: List[Loader], fields: Sequence[str]) -> List[Loader]:
+    """
+    选出条件需要的加载器，保持原有顺序
+
+    声明了 provides 的加载器只有在提供条件引用的字段，或提供其他选中加载器 requires 的字段时才保留；
+    未声明 provides 的加载器无法判断，总是保留
+    """
+    needed = {_field_name(f) for f in fields}
+    selected = [not loader.provides for loader in loaders]
+    for i, loader in enumerate(loaders):
+        if selected[i]:
+            needed |= loader.requires
+    # 选中的加载器所需字段可能由其他加载器提供，迭代到不再变化
+    changed = True
+    while changed:
+        changed = False
+        for i, loader in enumerate(loaders):
+            if not selected[i] and loader.provides & needed:
+                selected[i] = True
+                needed |= loader.requires
+                changed = True
+    return [loader for i, loader in enumerate(loaders) if selected[i]]
+
+
+def loader_dependencies(loaders: List[Loader]) -> List[List[int]]:
+    """
+    根据字段声明构建加载器依赖图，返回每个加载器依赖的加载器下标
+
+    声明了 requires 的加载器依赖提供这些字段的加载器；未声明字段的加载器依赖其前面所有
+    加载器，其后的加载器也都依赖它。存在环时抛出ValueError
+    """
+    deps: List[List[int]] = []
+    last_barrier: Optional[int] = None
+    for i, loader in enumerate(loaders):
+        if not loader.declared:
+            deps.append(list(range(i)))
+            last_barrier = i
+            continue
+        current = {j for j, other in enumerate(loaders)
+                   if j != i and other.declared and other.provides & loader.requires}
+        if last_barrier is not None:
+            current.add(last_barrier)
+        deps.append(sorted(current))
+
+    _check_acyclic(loaders, deps)
+    return deps
+
+
+def _check_acyclic(loaders: List[Loader], deps: List[List[int]]) -> None:
+    visiting, done = set(), set()
+
+    def visit(i: int, path: List[int]) -> None:
+        if i in done:
+            return
+        if i in visiting:
+            cycle = path[path.index(i):] + [i]
+            raise ValueError("loader dependency cycle: " + " -> ".join(loaders[j].name for j in cycle))
+        visiting.add(i)
+        for j in deps[i]:
+            visit(j, path + [i])
+        visiting.discard(i)
+        done.add(i)
+
+    for i in range(len(loaders)):
+        visit(i, [])
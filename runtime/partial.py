@@ -0,0 +1,89 @@
+from typing import AbstractSet, Any, Callable, List, Mapping, Optional
+from condition.condition import Condition, JoinOp
+from expr.compiler import ConditionCompiler
+from .accessor import referenced_fields
+
+# 三值求值函数：True/False 为确定结果，None 表示依赖的字段尚未加载
+PartialEvaluateFunc = Callable[[Mapping[str, Any]], Optional[bool]]
+
+
+def _field_names(c: Condition) -> List[str]:
+    return [f[:-2] if f.endswith("()") else f for f in referenced_fields(c)]
+
+
+def compile_partial(c: Condition, known: AbstractSet[str],
+                    compiler: ConditionCompiler) -> Optional[PartialEvaluateFunc]:
+    """
+    编译三值部分求值函数
+
+    只有引用字段都在 known 中的子条件参与求值，其余视为未知；AND 中任一为假即为假、
+    OR 中任一为真即为真，NOT 保持未知。子条件求值出错也视为未知，留给完整求值给出原因。
+    整个条件都无法确定时返回None
+    """
+    target = c.transform_forward().simplify()
+    return _compile(target, known, compiler)
+
+
+def _compile(c: Condition, known: AbstractSet[str], compiler: ConditionCompiler) -> Optional[PartialEvaluateFunc]:
+    if c.is_join() and c.join_op in (JoinOp.AND, JoinOp.OR):
+        children = [f for f in (_compile(child, known, compiler) for child in c.conditions) if f is not None]
+        if not children:
+            return None
+        return _all_of(children, len(children) == len(c.conditions)) if c.join_op == JoinOp.AND \
+            else _any_of(children, len(children) == len(c.conditions))
+
+    if c.is_join() and c.join_op == JoinOp.NOT and not c.required and len(c.conditions) == 1:
+        child = _compile(c.conditions[0], known, compiler)
+        if child is None:
+            return None
+
+        def evaluate_not(env: Mapping[str, Any]) -> Optional[bool]:
+            value = child(env)
+            return None if value is None else not value
+
+        return evaluate_not
+
+    # 叶子条件，或带 required 的 NOT 整体求值
+    if not set(_field_names(c)) <= known:
+        return None
+    evaluate = compiler.compile(c)
+
+    def evaluate_leaf(env: Mapping[str, Any]) -> Optional[bool]:
+        try:
+            return bool(evaluate(env))
+        except Exception:
+            return None
+
+    return evaluate_leaf
+
+
+def _all_of(children: List[PartialEvaluateFunc], complete: bool) -> PartialEvaluateFunc:
+    """complete 为 False 时有子条件未知，结果最多确定为假"""
+
+    def evaluate(env: Mapping[str, Any]) -> Optional[bool]:
+        result: Optional[bool] = True if complete else None
+        for child in children:
+            value = child(env)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
+    return evaluate
+
+
+def _any_of(children: List[PartialEvaluateFunc], complete: bool) -> PartialEvaluateFunc:
+    """complete 为 False 时有子条件未知，结果最多确定为真"""
+
+    def evaluate(env: Mapping[str, Any]) -> Optional[bool]:
+        result: Optional[bool] = False if complete else None
+        for child in children:
+            value = child(env)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
+    return evaluate
@@ -0,0 +1,275 @@
+from collections.abc import Mapping as MappingABC
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Hashable, List, Mapping, Optional, Tuple
+from condition.condition import Condition, JoinOp
+from condition.op import Op
+from condition.values import unquote, val_to_int64_slice, val_to_string_slice, val_to_time
+from condition.var import ValType
+from expr.compiler import ConditionCompiler, EvaluateFunc
+from expr.expr import ExpressionBuilder
+from expr.value_handle.base_handler import field_accessor
+from .accessor import LazyEnv
+from .interval_index import IntervalIndex, RangeOps
+
+# 可建立哈希索引的值类型
+_HASH_INDEX_VAL_TYPES = [ValType.INT, ValType.STRING, ValType.BOOL]
+# 可建立区间索引的值类型
+_RANGE_INDEX_VAL_TYPES = [ValType.INT, ValType.FLOAT, ValType.TIME]
+_RELATIVE_RANGE_INDEX_VAL_TYPES = [ValType.TIME_BEFORE, ValType.TIME_AFTER]
+# 判断相对时间单位是否为定长时使用的两个参考时间（月份天数不同）
+_PERIOD_REFERENCES = [datetime(2001, 1, 31, 12), datetime(2004, 2, 29, 12)]
+# 单条规则按 OR 拆分的默认分支上限，超过时整条规则不拆分、不建立索引
+DEFAULT_MAX_OR_BRANCHES = 1024
+
+
+class _Conjunction:
+    """规则拆分后的一个合取条件"""
+
+    __slots__ = ('rule_id', 'seq', 'evaluate')
+
+    def __init__(self, rule_id: Hashable, seq: int, evaluate: EvaluateFunc):
+        self.rule_id = rule_id
+        self.seq = seq
+        self.evaluate = evaluate
+
+
+class RuleIndex:
+    """
+    规则倒排索引
+
+    每条规则按 OR 拆分为多个合取条件，每个合取条件选一个 EQ/IN/ContainsAny(非关键词)
+    叶子条件，以 (字段, 值) 建立哈希倒排；没有这类叶子时，选一个 INT/FLOAT/TIME/
+    TIME_BEFORE/TIME_AFTER 的范围叶子放入字段的区间索引。查询时按条目的字段值探测索引
+    得到候选，只对候选合取条件完整求值。无可索引叶子的合取条件每次查询都作为候选。
+    拆分分支数超过 max_or_branches 的规则不拆分，整体作为一个无索引条件
+    """
+
+    def __init__(self, functions: Optional[Dict[str, Callable]] = None,
+                 max_or_branches: Optional[int] = DEFAULT_MAX_OR_BRANCHES):
+        self._compiler = ConditionCompiler(functions)
+        self._builder = ExpressionBuilder()
+        self._max_or_branches = max_or_branches
+        self._rules: Dict[Hashable, Condition] = {}
+        # 结构相同的合取条件只编译一次
+        self._compiled: Dict[Condition, EvaluateFunc] = {}
+        self._seq = 0
+        # EQ/IN 叶子：字段 -> 值 -> 合取条件
+        self._eq_index: Dict[str, Dict[Any, List[_Conjunction]]] = {}
+        # ContainsAny 叶子：字段 -> 字符串值 -> 合取条件（与 ContainsAny 一样按字符串比较）
+        self._contains_index: Dict[str, Dict[str, List[_Conjunction]]] = {}
+        # 范围叶子：字段 -> 区间索引；相对时间以相对现在的偏移量为阈值
+        self._range_index: Dict[str, IntervalIndex[_Conjunction]] = {}
+        self._relative_range_index: Dict[str, IntervalIndex[_Conjunction]] = {}
+        # 无可索引叶子的合取条件
+        self._unindexed: List[_Conjunction] = []
+        # 索引字段的取值函数
+        self._accessors: Dict[str, Callable[[Mapping[str, Any]], Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __contains__(self, rule_id: Hashable) -> bool:
+        return rule_id in self._rules
+
+    def add(self, rule_id: Hashable, c: Condition) -> None:
+        """添加规则"""
+        if rule_id in self._rules:
+            raise ValueError(f"rule {rule_id} already exists")
+        # 先校验并编译全部合取条件，任一失败（如字面量非法）时不注册规则，也不留下部分索引
+        self._compiler.validate(c)
+        compiled: List[Tuple[Condition, EvaluateFunc, List[Condition]]] = []
+        for conjunction in self._builder.iter_split_or(c, self._max_or_branches, fallback=True):
+            leaves = _conjunction_leaves(conjunction)
+            if any(leaf.is_always_false() for leaf in leaves):
+                continue
+            evaluate = self._compiled.get(conjunction) or self._compiler.compile(conjunction)
+            compiled.append((conjunction, evaluate, leaves))
+
+        self._rules[rule_id] = c
+        seq = self._seq
+        self._seq += 1
+        for conjunction, evaluate, leaves in compiled:
+            self._compiled[conjunction] = evaluate
+            self._add_conjunction(_Conjunction(rule_id, seq, evaluate), leaves)
+
+    def _add_conjunction(self, entry: _Conjunction, leaves: List[Condition]) -> None:
+        best: Optional[Tuple[Dict, str, List[Any]]] = None
+        for leaf in leaves:
+            posting = self._hash_posting(leaf)
+            if posting is not None and (best is None or len(posting[2]) < len(best[2])):
+                best = posting
+
+        if best is not None:
+            index, field, keys = best
+            self._add_accessor(field)
+            values = index.setdefault(field, {})
+            for key in keys:
+                values.setdefault(key, []).append(entry)
+            return
+
+        for leaf in leaves:
+            posting = self._range_posting(leaf)
+            if posting is not None:
+                index, field, threshold = posting
+                self._add_accessor(field)
+                index.setdefault(field, IntervalIndex()).add(leaf.op, threshold, entry)
+                return
+
+        self._unindexed.append(entry)
+
+    def _add_accessor(self, field: str) -> None:
+        if field not in self._accessors:
+            self._accessors[field] = field_accessor(field)
+
+    def _hash_posting(self, leaf: Condition) -> Optional[Tuple[Dict, str, List[Any]]]:
+        """叶子条件可哈希索引时返回 (索引, 字段环境名, 索引值列表)"""
+        if leaf.is_join() or not leaf.field or leaf.val_type not in _HASH_INDEX_VAL_TYPES:
+            return None
+        if leaf.is_always_true():
+            return None
+
+        field = leaf.field
+        try:
+            if leaf.op == Op.EQ:
+                return self._eq_index, field, [_typed_value(leaf.val_type, leaf.val)]
+            if leaf.op == Op.IN and leaf.val_type != ValType.BOOL:
+                return self._eq_index, field, list(set(_typed_values(leaf.val_type, leaf.val)))
+            if leaf.op == Op.CONTAINS_ANY and not leaf.keyword and leaf.val_type != ValType.BOOL:
+                return self._contains_index, field, list({str(v) for v in _typed_values(leaf.val_type, leaf.val)})
+        except ValueError:
+            return None
+        return None
+
+    def _range_posting(self, leaf: Condition) -> Optional[Tuple[Dict, str, Any]]:
+        """叶子条件可区间索引时返回 (索引, 字段环境名, 阈值)"""
+        if leaf.is_join() or not leaf.field or leaf.op not in RangeOps:
+            return None
+
+        try:
+            if leaf.val_type in _RANGE_INDEX_VAL_TYPES:
+                return self._range_index, leaf.field, _range_threshold(leaf.val_type, leaf.val)
+            if leaf.val_type in _RELATIVE_RANGE_INDEX_VAL_TYPES:
+                duration = int(unquote(leaf.val))
+                if leaf.val_type == ValType.TIME_BEFORE:
+                    duration = -duration
+                offset = self._period_offset(duration, leaf.period_unit)
+                if offset is not None:
+                    return self._relative_range_index, leaf.field, offset
+        except (ValueError, OverflowError):
+            return None
+        return None
+
+    def _period_offset(self, duration: int, period_unit: int) -> Optional[timedelta]:
+        """相对时间边界相对现在的偏移量，单位非定长（如月）时返回None"""
+        add_period = self._compiler.functions["AddPeriod"]
+        offsets = {add_period(ref, duration, period_unit) - ref for ref in _PERIOD_REFERENCES}
+        return offsets.pop() if len(offsets) == 1 else None
+
+    def match(self, item: Any) -> List[Hashable]:
+        """返回条目满足的规则ID，按添加顺序"""
+        env = item if isinstance(item, MappingABC) else LazyEnv(item)
+        # 探测区间索引与完整求值使用同一时钟快照
+        with self._compiler.functions["Clock"].snapshot() as snapshot:
+            return self._match(env, snapshot.now)
+
+    def _match(self, env: Mapping[str, Any], now: datetime) -> List[Hashable]:
+        candidates: Dict[int, _Conjunction] = {}
+        for entry in self._unindexed:
+            candidates[id(entry)] = entry
+        for field, values in self._eq_index.items():
+            value = self._field_value(env, field)
+            if value is _MISSING:
+                continue
+            try:
+                entries = values.get(value)
+            except TypeError:
+                # 不可哈希的值（如列表）不可能满足 EQ/IN
+                continue
+            if entries:
+                for entry in entries:
+                    candidates[id(entry)] = entry
+        for field, values in self._contains_index.items():
+            value = self._field_value(env, field)
+            if value is _MISSING:
+                continue
+            probes = [str(v) for v in value] if hasattr(value, '__iter__') else [str(value)]
+            for probe in probes:
+                entries = values.get(probe)
+                if entries:
+                    for entry in entries:
+                        candidates[id(entry)] = entry
+
+        self._probe_ranges(env, candidates, now)
+
+        return self._verify(candidates.values(), env)
+
+    def _probe_ranges(self, env: Mapping[str, Any], candidates: Dict[int, _Conjunction], now: datetime) -> None:
+        """探测区间索引"""
+        for index, relative in ((self._range_index, False), (self._relative_range_index, True)):
+            for field, intervals in index.items():
+                value = self._field_value(env, field)
+                if value is _MISSING:
+                    continue
+                try:
+                    entries = intervals.query(value - now if relative else value)
+                except TypeError:
+                    continue
+                for entry in entries:
+                    candidates[id(entry)] = entry
+
+    def _field_value(self, env: Mapping[str, Any], field: str) -> Any:
+        try:
+            return self._accessors[field](env)
+        except (KeyError, AttributeError, TypeError):
+            return _MISSING
+
+    def _verify(self, candidates, env: Mapping[str, Any]) -> List[Hashable]:
+        """对候选合取条件完整求值"""
+        matched: Dict[Hashable, int] = {}
+        for entry in sorted(candidates, key=lambda e: e.seq):
+            if entry.rule_id in matched:
+                continue
+            try:
+                if entry.evaluate(env):
+                    matched[entry.rule_id] = entry.seq
+            except Exception:
+                continue
+        return list(matched)
+
+
+_MISSING = object()
+
+
+def _conjunction_leaves(c: Condition) -> List[Condition]:
+    """展开合取条件中的 AND，返回各合取项"""
+    if c.is_join() and c.join_op == JoinOp.AND:
+        leaves = []
+        for child in c.conditions:
+            leaves.extend(_conjunction_leaves(child))
+        return leaves
+    if not c.is_join() and c.op and c.op.forward_op():
+        return [c.transform_forward()]
+    return [c]
+
+
+def _typed_value(val_type: int, val: str) -> Any:
+    val = unquote(val)
+    if val_type == ValType.INT:
+        return int(val)
+    if val_type == ValType.BOOL:
+        return val.lower() in ("true", "1")
+    return val
+
+
+def _typed_values(val_type: int, val: str) -> List[Any]:
+    if val_type == ValType.INT:
+        return val_to_int64_slice(val)
+    return val_to_string_slice(val)
+
+
+def _range_threshold(val_type: int, val: str) -> Any:
+    if val_type == ValType.INT:
+        return int(unquote(val))
+    if val_type == ValType.FLOAT:
+        return float(unquote(val))
+    return val_to_time(val)
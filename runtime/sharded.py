@@ -0,0 +1,110 @@
+import asyncio
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from condition.condition import Condition
+from expr.clock import Clock
+
+# 子进程内编译好的求值闭包与时钟，由进程池初始化函数设置
+_worker_evaluate: Optional[Callable] = None
+_worker_clock: Optional[Clock] = None
+
+
+def _init_worker(condition: Condition, functions: Dict[str, Callable]) -> None:
+    """子进程初始化：条件只传输、编译一次"""
+    from expr.compiler import compile_condition
+    global _worker_evaluate, _worker_clock
+    _worker_clock = Clock()
+    _worker_evaluate = compile_condition(condition, dict(functions, Clock=_worker_clock))
+
+
+def _evaluate_chunk(names: Tuple[str, ...], rows: List[tuple], now: datetime) -> Tuple[bytes, Dict[int, str]]:
+    """
+    子进程内评估一个分片
+
+    rows 为按 names 顺序排列的字段值元组；返回 (每行是否命中的字节串, 行号 -> 错误信息)
+    """
+    evaluate = _worker_evaluate
+    matched = bytearray(len(rows))
+    errors: Dict[int, str] = {}
+    with _worker_clock.snapshot(now):
+        for i, row in enumerate(rows):
+            try:
+                if evaluate(dict(zip(names, row))):
+                    matched[i] = 1
+            except Exception as e:
+                errors[i] = str(e)
+    return bytes(matched), errors
+
+
+def _custom_functions(functions: Dict[str, Callable]) -> Dict[str, Callable]:
+    """
+    需要发送给子进程的自定义函数
+
+    时钟与内置函数不发送：子进程的编译器会自行创建内置函数（其中有闭包，不可pickle）。
+    与内置函数同名且同一实现（同一代码对象或同一类型）的视为内置函数
+    """
+    from expr.compiler import default_functions
+    defaults = default_functions()
+    shipped = {}
+    for name, fn in functions.items():
+        if name == "Clock":
+            continue
+        default = defaults.get(name)
+        if default is not None:
+            code = getattr(fn, '__code__', None)
+            if (code is not None and code is getattr(default, '__code__', None)) or \
+                    (code is None and type(fn) is type(default)):
+                continue
+        shipped[name] = fn
+    return shipped
+
+
+class ShardedEvaluator:
+    """
+    多进程分片评估
+
+    进程池初始化时把条件（可pickle）和自定义函数发送给每个子进程并编译一次，
+    之后只发送分片：字段名元组加字段值元组列表。结果按分片顺序合并，保持条目原有顺序。
+    自定义函数需可pickle（模块级函数），否则构造时抛出ValueError；时钟不随函数发送，
+    各分片使用父进程的快照时间
+    """
+
+    def __init__(self, condition: Condition, functions: Dict[str, Callable], processes: Optional[int] = None,
+                 chunk_size: int = 1024):
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+        self.chunk_size = chunk_size
+        shipped = _custom_functions(functions)
+        # 构造时检查可否pickle：fork 启动方式下不会暴露，spawn 下要到首次评估才失败
+        try:
+            pickle.dumps((condition, shipped))
+        except Exception as e:
+            raise ValueError(f"condition and functions must be picklable for sharded evaluation "
+                             f"(use module-level functions): {e}") from e
+        self._pool = ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                         initargs=(condition, shipped))
+
+    async def evaluate(self, names: Sequence[str], rows: List[tuple],
+                       now: datetime) -> Tuple[List[bool], Dict[int, str]]:
+        """评估所有行，返回 (每行是否命中, 行号 -> 错误信息)"""
+        loop = asyncio.get_running_loop()
+        names = tuple(names)
+        starts = range(0, len(rows), self.chunk_size)
+        chunks = await asyncio.gather(*[
+            loop.run_in_executor(self._pool, _evaluate_chunk, names, rows[start:start + self.chunk_size], now)
+            for start in starts
+        ])
+
+        matched: List[bool] = []
+        errors: Dict[int, str] = {}
+        for start, (chunk_matched, chunk_errors) in zip(starts, chunks):
+            matched.extend(b == 1 for b in chunk_matched)
+            for i, error in chunk_errors.items():
+                errors[start + i] = error
+        return matched, errors
+
+    def close(self) -> None:
+        """关闭进程池"""
+        self._pool.shutdown()